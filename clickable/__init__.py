@@ -1,57 +1,38 @@
 #!/usr/bin/env python3
 
 import argparse
+import copy
 import sys
-import inspect
-import glob
-from os.path import dirname, basename, isfile, join, expanduser
+from os.path import isfile, expanduser
 import subprocess
 import logging
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import json
 
-requests_available = True
-try:
-    import requests
-except ImportError:
-    requests_available = False
-
-from clickable.commands.base import Command
-from clickable.config.project import ProjectConfig
-from clickable.container import Container
-from clickable.logger import logger, log_file, console_handler
+from clickable.commands import COMMANDS, ALIASES, get_command_class
+from clickable.completion import CLI_ARGS, DESKTOP_CLI_ARGS, get_completion_words
+from clickable.logger import logger, log_file, console_handler, set_log_prefix
 from clickable.exceptions import ClickableException
 
+# The config and container modules (and the docker API client with them) are
+# only imported once a command runs, so that shell completion starts quickly
+
 
 __version__ = '6.24.1'
 __container_minimum_required__ = 4
 
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
 
+# Commands that can be run for several architectures at once
+MULTI_ARCH_COMMANDS = ['clean', 'clean-build', 'clean-libs', 'build', 'build-libs', 'review']
+
 
 class Clickable(object):
     def __init__(self):
         self.config = None
-        self.command_classes = {}
-        self.command_names = []
-        self.command_aliases = {}
-        self.command_help = {}
-
-        command_dir = dirname(__file__)
-        modules = glob.glob(join(command_dir, 'commands/*.py'))
-        command_modules = [basename(f)[:-3] for f in modules if isfile(f) and not f.endswith('__init__.py')]
-
-        for name in command_modules:
-            command_submodule = __import__('clickable.commands.{}'.format(name), globals(), locals(), [name])
-            for name, cls in inspect.getmembers(command_submodule):
-                if inspect.isclass(cls) and issubclass(cls, Command) and cls != Command and cls.name not in self.command_classes:
-                    self.command_classes[cls.name] = cls
-                    self.command_names.append(cls.name)
-                    if cls.help:
-                        self.command_help[cls.name] = cls.help
-
-                    for alias in cls.aliases:
-                        self.command_aliases[alias] = cls.name
+        self.command_names = list(COMMANDS)
+        self.command_aliases = dict(ALIASES)
 
     def show_valid_commands(self):
         n = [
@@ -98,7 +79,7 @@ class Clickable(object):
         parser.add_argument(
             '--arch',
             '-a',
-            help='Use the specified arch when building'
+            help='Use the specified arch when building, a comma separated list of archs builds them in parallel'
         )
         parser.add_argument(
             '--verbose',
@@ -130,6 +111,42 @@ class Clickable(object):
             help='Do not clean build directory (affects default command chain and desktop command)',
             default=False,
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Keep the build directory and skip build steps whose inputs did not change',
+            default=False,
+        )
+        parser.add_argument(
+            '--ccache',
+            action='store_true',
+            help='Cache compiler output of C/C++ builds in ~/.clickable/ccache',
+            default=False,
+        )
+        parser.add_argument(
+            '--apt-cache',
+            action='store_true',
+            help='Cache downloaded packages for docker image builds in ~/.clickable/apt',
+            default=False,
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild libraries and upload click packages even if they did not change since the last build or upload',
+            default=False,
+        )
+        parser.add_argument(
+            '--click-cache',
+            action='store_true',
+            help='Reuse previously built and reviewed click packages with the same contents',
+            default=False,
+        )
+        parser.add_argument(
+            '--reproducible',
+            action='store_true',
+            help='Build byte-identical click packages from the same files (timestamps are clamped to SOURCE_DATE_EPOCH)',
+            default=False,
+        )
         parser.add_argument(
             '--debug-build',
             action='store_true',
@@ -198,6 +215,12 @@ class Clickable(object):
             help='Do not review click package after build (useful for unconfined apps)',
             default=False,
         )
+        parser.add_argument(
+            '--persistent-container',
+            action='store_true',
+            help='Run all build steps of this invocation in one long-lived container instead of a new one per step',
+            default=False,
+        )
         return parser
 
     def parse_args(self):
@@ -213,11 +236,14 @@ class Clickable(object):
 
         return args
 
-    def setup_config(self, args, commands):
+    def setup_config(self, args, commands, parallel_builds=1):
+        from clickable.config.project import ProjectConfig
+
         return ProjectConfig(
             args=args,
             clickable_version=__version__,
             commands=commands,
+            parallel_builds=parallel_builds,
         )
 
     def show_version(self):
@@ -225,64 +251,77 @@ class Clickable(object):
         self.check_version()
 
     def check_version(self, quiet=False):
-        if requests_available:
-            version = None
-            check = True
-            version_check = expanduser('~/.clickable/version_check.json')
-            if isfile(version_check):
-                with open(version_check, 'r') as f:
-                    try:
-                        version_check_data = json.load(f)
-                    except ValueError:
-                        version_check_data = None
-
-                if version_check_data and 'version' in version_check_data and 'datetime' in version_check_data:
-                    last_check = datetime.strptime(version_check_data['datetime'], DATE_FORMAT)
-                    if last_check > (datetime.now() - timedelta(days=2)) and \
-                        'current_version' in version_check_data and \
-                        version_check_data['current_version'] == __version__:
-
-                        check = False
-                        version = version_check_data['version']
-                        logger.debug('Using cached version check')
-
-            if check:
-                logger.debug('Checking for updates to clickable')
-
+        version = None
+        check = True
+        version_check = expanduser('~/.clickable/version_check.json')
+        if isfile(version_check):
+            with open(version_check, 'r') as f:
                 try:
-                    response = requests.get(
-                        'https://clickable-ut.dev/en/latest/_static/version.json',
-                        timeout=5
-                    )
-                    response.raise_for_status()
-
-                    data = response.json()
-                    version = data['version']
-                except requests.exceptions.Timeout as e:
-                    logger.warning('Unable to check for updates to clickable, the request timedout')
-                except Exception as e:
-                    logger.debug('Version check failed:' + str(e.cmd), exc_info=e)
-                    logger.warning('Unable to check for updates to clickable, an unknown error occurred')
-
-                if version:
-                    with open(version_check, 'w') as f:
-                        json.dump({
-                            'version': version,
-                            'datetime': datetime.now().strftime(DATE_FORMAT),
-                            'current_version': __version__,
-                        }, f)
+                    version_check_data = json.load(f)
+                except ValueError:
+                    version_check_data = None
+
+            if version_check_data and 'version' in version_check_data and 'datetime' in version_check_data:
+                last_check = datetime.strptime(version_check_data['datetime'], DATE_FORMAT)
+                if last_check > (datetime.now() - timedelta(days=2)) and \
+                    'current_version' in version_check_data and \
+                    version_check_data['current_version'] == __version__:
+
+                    check = False
+                    version = version_check_data['version']
+                    logger.debug('Using cached version check')
+
+        if check:
+            # Only imported when needed, as it takes a noticeable time
+            try:
+                import requests
+            except ImportError:
+                if not quiet:
+                    logger.warning('Unable to check for updates to clickable, please install "requests"')
+                return
+
+            logger.debug('Checking for updates to clickable')
+
+            try:
+                response = requests.get(
+                    'https://clickable-ut.dev/en/latest/_static/version.json',
+                    timeout=5
+                )
+                response.raise_for_status()
+
+                data = response.json()
+                version = data['version']
+            except requests.exceptions.Timeout as e:
+                logger.warning('Unable to check for updates to clickable, the request timedout')
+            except Exception as e:
+                logger.debug('Version check failed:' + str(e.cmd), exc_info=e)
+                logger.warning('Unable to check for updates to clickable, an unknown error occurred')
 
             if version:
-                if version != __version__:
-                    logger.info('v{} of clickable is available, update to get the latest features and improvements!'.format(version))
-                else:
-                    if not quiet:
-                        logger.info('You are running the latest version of clickable!')
-        else:
-            if not quiet:
-                logger.warning('Unable to check for updates to clickable, please install "requests"')
+                with open(version_check, 'w') as f:
+                    json.dump({
+                        'version': version,
+                        'datetime': datetime.now().strftime(DATE_FORMAT),
+                        'current_version': __version__,
+                    }, f)
+
+        if version:
+            if version != __version__:
+                logger.info('v{} of clickable is available, update to get the latest features and improvements!'.format(version))
+            else:
+                if not quiet:
+                    logger.info('You are running the latest version of clickable!')
 
     def run(self, arg_commands=[], args=None):
+        from clickable.container import Container
+
+        if args and args.arch and ',' in args.arch:
+            try:
+                self.run_multi_arch(arg_commands, args)
+            finally:
+                Container.stop_sessions()
+            return
+
         self.config = self.setup_config(args, arg_commands)
         self.config.container = Container(self.config,
                 minimum_version=__container_minimum_required__)
@@ -312,30 +351,89 @@ class Clickable(object):
 
         for command in commands:
             if command in self.command_names:
-                cmd = self.command_classes[command](self.config)
+                cmd = get_command_class(command)(self.config)
                 cmd.preprocess(command_arg)
 
+        try:
+            self.run_commands(self.config, commands, command_arg, VALID_COMMANDS)
+        finally:
+            Container.stop_sessions()
+
+    def run_multi_arch(self, arg_commands, args):
+        '''
+        Runs the commands for each of the comma separated architectures in
+        parallel. Every architecture gets its own config, container and build
+        dir, its output is prefixed with the architecture.
+        '''
+
+        from clickable.container import Container
+        from clickable.system.resources import get_available_cpus
+
+        archs = [arch.strip() for arch in args.arch.split(',') if arch.strip()]
+        if len(set(archs)) != len(archs):
+            raise ClickableException('Architectures must not be specified more than once')
+
+        # The builds share the available CPUs and memory
+        workers = min(len(archs), get_available_cpus())
+
+        # Configs are set up one after another, as that changes the environment
+        configs = []
+        for arch in archs:
+            arch_args = copy.copy(args)
+            arch_args.arch = arch
+
+            config = self.setup_config(arch_args, arg_commands, workers)
+            if config.container_mode:
+                raise ClickableException('Building for multiple architectures at once is not supported in container mode')
+
+            config.container = Container(config, minimum_version=__container_minimum_required__)
+            configs.append(config)
+
+        self.config = configs[0]
+        commands = [self.command_aliases.get(command, command) for command in self.config.commands]
+        unsupported = [command for command in commands if command not in MULTI_ARCH_COMMANDS]
+        if unsupported:
+            raise ClickableException('The command(s) {} cannot be run for multiple architectures at once, supported are: {}'.format(
+                ', '.join(unsupported), ', '.join(MULTI_ARCH_COMMANDS)))
+
+        for config in configs:
+            for command in commands:
+                get_command_class(command)(config).preprocess('')
+
+        def run_arch(config):
+            set_log_prefix(config.arch)
+            try:
+                self.run_commands(config, commands, '', self.command_names)
+            finally:
+                set_log_prefix(None)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(config.arch, executor.submit(run_arch, config)) for config in configs]
+
+        errors = []
+        for arch, future in futures:
+            error = future.exception()
+            if error:
+                logger.error('Building for {} failed'.format(arch))
+                errors.append(error)
+            else:
+                logger.info('Building for {} succeeded'.format(arch))
+
+        if errors:
+            raise errors[0]
+
+    def run_commands(self, config, commands, command_arg, valid_commands):
         for command in commands:
             if command == 'bash-completion':
-                cli_args = [
-                    '--serial-number', '--config', '--ssh', '--arch',
-                    '--verbose', '--container-mode', '--apikey',
-                    '--docker-image', '--dirty', '--debug',
-                ]
-                print(' '.join(sorted(VALID_COMMANDS + cli_args)))
+                print(' '.join(sorted(valid_commands + CLI_ARGS)))
             elif command == 'bash-completion-desktop':
-                cli_args = [
-                    '--nvidia', '--no-nvidia' '--gdbserver', '--gdb',
-                    '--dark-mode', '--lang', '--skip-build', '--dirty',
-                    '--verbose', '--config',
-                ]
-                print(' '.join(sorted(cli_args)))
-            elif command in self.config.scripts:
+                print(' '.join(sorted(DESKTOP_CLI_ARGS)))
+            elif command in config.scripts:
                 logger.debug('Running the "{}" script'.format(command))
-                subprocess.check_call(self.config.scripts[command], cwd=self.config.cwd, shell=True)
+                subprocess.check_call(config.scripts[command], cwd=config.cwd, shell=True)
             elif command in self.command_names:
                 logger.debug('Running the "{}" command'.format(command))
-                cmd = self.command_classes[command](self.config)
+                cmd = get_command_class(command)(config)
                 cmd.run(command_arg)
             else:
                 logger.error('There is no builtin or custom command named "{}"'.format(command))
@@ -347,6 +445,11 @@ def main():
     clickable = Clickable()
     args = clickable.parse_args()
 
+    # Called on every TAB press, so don't set up the config and container
+    if args.commands in (['bash-completion'], ['bash-completion-desktop']):
+        print(' '.join(get_completion_words(args.commands[0], args.config)))
+        return
+
     if args.verbose:
         console_handler.setLevel(logging.DEBUG)
     logger.debug('Clickable v' + __version__)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+from clickable.logger import logger
+from clickable.utils import get_image_id, hash_file, hash_tree
+
+
+# Config values which don't have any influence on the build result
+IGNORED_CONFIG_KEYS = ['default', 'dirty', 'incremental', 'scripts', 'test']
+
+
+class BuildManifest(object):
+    '''
+    Records a digest of the inputs of each build step, so that steps whose
+    inputs did not change since the last build can be skipped. File digests
+    are cached by size and mtime to avoid re-reading unchanged files.
+    '''
+
+    def __init__(self, path, common_inputs={}):
+        self.path = path
+        self.common_inputs = common_inputs
+        self.steps = {}
+        self.files = {}
+        # Files hashed in this run, only those are kept in the file cache
+        self.seen_files = set()
+        self.pending = {}
+        self.ran = set()
+
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+
+        with open(self.path, 'r') as f:
+            try:
+                manifest = json.load(f)
+                self.steps = manifest.get('steps', {})
+                self.files = manifest.get('files', {})
+            except ValueError:
+                logger.warning('Build manifest is invalid, rebuilding everything')
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({
+                'steps': self.steps,
+                'files': {path: cached for (path, cached) in self.files.items() if path in self.seen_files},
+            }, f)
+
+    def hash_file(self, path):
+        stat = os.stat(path)
+        self.seen_files.add(path)
+        cached = self.files.get(path, None)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hash_file(path)
+        self.files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def hash_tree(self, root, ignore=[], extensions=None):
+        return hash_tree(root, ignore, extensions, hash_file=self.hash_file)
+
+    def hash_sources(self, config, extensions=None):
+        '''
+        Digest over the source directory, leaving out ignored files as well
+        as the build and install directories.
+        '''
+
+        ignore = list(config.config.get('ignore', [])) + ['.git', '.bzr', '.clickable']
+        for path in [config.build_dir, config.install_dir]:
+            rel_path = os.path.relpath(path, config.src_dir)
+            if rel_path != '.' and not rel_path.startswith('..'):
+                ignore.append(os.path.join(config.src_dir, rel_path.split(os.sep)[0]))
+
+        return self.hash_tree(config.src_dir, ignore, extensions)
+
+    def digest(self, inputs):
+        inputs = {
+            'common': self.common_inputs,
+            'step': inputs,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_up_to_date(self, step, inputs, outputs=[], depends=[], force=False):
+        '''
+        Checks whether step can be skipped. Callers running the step
+        afterwards have to call record() once it succeeded.
+        '''
+
+        digest = self.digest(inputs)
+        self.pending[step] = digest
+
+        if force or any(d in self.ran for d in depends):
+            return False
+
+        if not all(os.path.exists(output) for output in outputs):
+            return False
+
+        if self.steps.get(step, None) != digest:
+            return False
+
+        logger.info('Skipping {}, nothing changed since the last build'.format(step))
+        return True
+
+    def record(self, step):
+        self.steps[step] = self.pending.pop(step)
+        self.ran.add(step)
+        self.save()
+
+
+def get_build_manifest_path(config):
+    return os.path.join(config.build_dir, '.clickable', 'build_manifest.json')
+
+
+def create_build_manifest(config):
+    image_id = None
+    # Container free builds don't use the image, so don't ask docker for it
+    if not config.container_mode and not config.is_container_free_build():
+        image_id = get_image_id(config.container.docker_image)
+
+    common_inputs = {
+        'config': {key: value for key, value in config.config.items() if key not in IGNORED_CONFIG_KEYS},
+        'debug_build': config.debug_build,
+        'container_mode': config.container_mode,
+        'image': image_id,
+    }
+
+    return BuildManifest(get_build_manifest_path(config), common_inputs)
@@ -0,0 +1,24 @@
+import importlib
+
+from clickable.config.constants import Constants
+
+
+# Builder name: (module, class), so that only the builder in use is imported
+BUILDERS = {
+    Constants.PURE_QML_QMAKE: ('pure', 'PureQMLQMakeBuilder'),
+    Constants.QMAKE: ('qmake', 'QMakeBuilder'),
+    Constants.PURE_QML_CMAKE: ('pure', 'PureQMLCMakeBuilder'),
+    Constants.CMAKE: ('cmake', 'CMakeBuilder'),
+    Constants.CUSTOM: ('custom', 'CustomBuilder'),
+    Constants.CORDOVA: ('cordova', 'CordovaBuilder'),
+    Constants.PURE: ('pure', 'PureBuilder'),
+    Constants.PYTHON: ('pure', 'PythonBuilder'),
+    Constants.GO: ('go', 'GoBuilder'),
+    Constants.RUST: ('rust', 'RustBuilder'),
+    Constants.PRECOMPILED: ('pure', 'PrecompiledBuilder'),
+}
+
+
+def get_builder(name):
+    module, cls = BUILDERS[name]
+    return getattr(importlib.import_module('clickable.builders.{}'.format(module)), cls)
@@ -1,3 +1,5 @@
+import os
+
 from .make import MakeBuilder
 from clickable.config.project import ProjectConfig
 from clickable.config.constants import Constants
@@ -17,11 +19,27 @@ class CMakeBuilder(MakeBuilder):
         if self.config.build_args:
             command = '{} {}'.format(command, ' '.join(self.config.build_args))
 
+        if self.config.ccache_dir:
+            command = '{} {}'.format(command, '-DCMAKE_C_COMPILER_LAUNCHER=ccache -DCMAKE_CXX_COMPILER_LAUNCHER=ccache')
+
         if self.config.debug_build:
             command = '{} {}'.format(command, '-DCMAKE_BUILD_TYPE=Debug')
         else:
             command = '{} {}'.format(command, '-DCMAKE_BUILD_TYPE=Release')
 
-        self.config.container.run_command('{} {} -DCMAKE_INSTALL_PREFIX:PATH=/.'.format(command, self.config.src_dir))
+        command = '{} {} -DCMAKE_INSTALL_PREFIX:PATH=/.'.format(command, self.config.src_dir)
+
+        manifest = self.config.build_manifest
+        if manifest:
+            inputs = {
+                'command': command,
+                'build_files': manifest.hash_sources(self.config, ['CMakeLists.txt', '.cmake', '.in']),
+            }
+            outputs = [os.path.join(self.config.build_dir, 'CMakeCache.txt')]
+            if not manifest.is_up_to_date('configure', inputs, outputs, depends=['prebuild']):
+                self.config.container.run_command(command)
+                manifest.record('configure')
+        else:
+            self.config.container.run_command(command)
 
         super().build()
@@ -5,30 +5,24 @@ import os
 from .base import Builder
 from clickable.config.project import ProjectConfig
 from clickable.config.constants import Constants
+from clickable.staging import IgnoreMatcher, get_sync_manifest_path, stage_tree
 
 
 class GoBuilder(Builder):
     name = Constants.GO
 
-    def _ignore(self, path, contents):
-        ignored = []
-        for content in contents:
-            cpath = os.path.abspath(os.path.join(path, content))
-            if (
-                cpath == os.path.abspath(self.config.install_dir) or
-                cpath == os.path.abspath(self.config.build_dir) or
-                content in self.config.ignore or
-                content == 'clickable.json' or
-
-                # Don't copy the go files, they will be compiled from the source directory
-                os.path.splitext(content)[1] == '.go'
-            ):
-                ignored.append(content)
-
-        return ignored
+    def get_ignore_matcher(self):
+        return IgnoreMatcher([
+            os.path.abspath(self.config.install_dir),
+            os.path.abspath(self.config.build_dir),
+            'clickable.json',
+        ] + self.config.ignore,
+            # Don't copy the go files, they will be compiled from the source directory
+            extensions=['.go'])
 
     def build(self):
-        shutil.copytree(self.config.cwd, self.config.install_dir, ignore=self._ignore)
+        stage_tree(self.config.cwd, self.config.install_dir, self.get_ignore_matcher(),
+                   get_sync_manifest_path(self.config))
 
         gocommand = '/usr/local/go/bin/go build -pkgdir {cwd}/.clickable/go -i -o {install_dir}/{app_name} ../../..'.format(
             cwd=self.config.cwd,
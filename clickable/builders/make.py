@@ -1,17 +1,18 @@
-import subprocess
 import shutil
 import sys
 import os
 
 from .base import Builder
 from clickable.logger import logger
+from clickable.utils import run_subprocess_check_call
 from clickable.config.project import ProjectConfig
 
 
 class MakeBuilder(Builder):
     def post_make(self):
         if self.config.postmake:
-            subprocess.check_call(self.config.postmake, cwd=self.config.build_dir, shell=True)
+            run_subprocess_check_call(self.config.postmake, cwd=self.config.build_dir, shell=True,
+                    env=self.config.get_process_env())
 
     def post_make_install(self):
         pass
@@ -40,7 +41,20 @@ class MakeBuilder(Builder):
         # The actual make command is implemented in the subclasses
 
     def build(self):
+        manifest = self.config.build_manifest
+        if manifest:
+            inputs = {
+                'sources': manifest.hash_sources(self.config),
+                'postmake': self.config.postmake,
+            }
+            outputs = [self.config.install_dir]
+            if manifest.is_up_to_date('make', inputs, outputs, depends=['prebuild', 'configure']):
+                return
+
         self.make()
         self.post_make()
         self.make_install()
         self.post_make_install()
+
+        if manifest:
+            manifest.record('make')
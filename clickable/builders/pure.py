@@ -10,6 +10,7 @@ from clickable.logger import logger
 from clickable.config.project import ProjectConfig
 from clickable.config.constants import Constants
 from clickable.exceptions import ClickableException
+from clickable.staging import IgnoreMatcher, get_sync_manifest_path, stage_tree
 
 
 class PureQMLMakeBuilder(MakeBuilder):
@@ -32,25 +33,19 @@ class PureQMLCMakeBuilder(PureQMLMakeBuilder, CMakeBuilder):
 class PureBuilder(Builder):
     name = Constants.PURE
 
-    def _ignore(self, path, contents):
-        ignored = []
-        for content in contents:
-            cpath = os.path.abspath(os.path.join(path, content))
-
-            if (
-                cpath == os.path.abspath(self.config.install_dir) or
-                cpath == os.path.abspath(self.config.build_dir) or
-                content in self.config.ignore or
-                content == 'clickable.json'
-            ):
-                ignored.append(content)
-
-        return ignored
+    def get_ignore_matcher(self):
+        return IgnoreMatcher([
+            os.path.abspath(self.config.install_dir),
+            os.path.abspath(self.config.build_dir),
+            'clickable.json',
+        ] + self.config.ignore)
 
     def build(self):
-        if os.path.isdir(self.config.install_dir):
+        # Dirty builds sync the existing install dir with the project
+        if os.path.isdir(self.config.install_dir) and not self.config.dirty:
             raise ClickableException('Build directory already exists. Please run "clickable clean" before building again!')
-        shutil.copytree(self.config.cwd, self.config.install_dir, ignore=self._ignore)
+        stage_tree(self.config.cwd, self.config.install_dir, self.get_ignore_matcher(),
+                   get_sync_manifest_path(self.config))
         logger.info('Copied files to install directory for click building')
 
 
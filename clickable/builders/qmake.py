@@ -1,3 +1,5 @@
+import os
+
 from .make import MakeBuilder
 from clickable.config.project import ProjectConfig
 from clickable.config.constants import Constants
@@ -20,6 +22,9 @@ class QMakeBuilder(MakeBuilder):
         if self.config.build_args:
             command = '{} {}'.format(command, ' '.join(self.config.build_args))
 
+        if self.config.ccache_dir:
+            command = '{} {}'.format(command, 'CONFIG+=ccache')
+
         if self.config.debug_build:
             command = '{} {}'.format(command, 'CONFIG+=debug')
 
@@ -27,6 +32,17 @@ class QMakeBuilder(MakeBuilder):
         if not any(arg.endswith(".pro") for arg in self.config.build_args):
             command = '{} {}'.format(command, self.config.src_dir)
 
-        self.config.container.run_command(command)
+        manifest = self.config.build_manifest
+        if manifest:
+            inputs = {
+                'command': command,
+                'build_files': manifest.hash_sources(self.config, ['.pro', '.pri', '.prf']),
+            }
+            outputs = [os.path.join(self.config.build_dir, 'Makefile')]
+            if not manifest.is_up_to_date('configure', inputs, outputs, depends=['prebuild']):
+                self.config.container.run_command(command)
+                manifest.record('configure')
+        else:
+            self.config.container.run_command(command)
 
         super().build()
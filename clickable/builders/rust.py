@@ -6,7 +6,8 @@ from .base import Builder
 from clickable.config.project import ProjectConfig
 from clickable.config.constants import Constants
 from clickable.exceptions import ClickableException
-from clickable.utils import find
+from clickable.staging import IgnoreMatcher, get_sync_manifest_path, stage_tree
+from clickable.utils import find_all
 
 
 rust_arch_target_mapping = {
@@ -51,23 +52,11 @@ class RustBuilder(Builder):
         return rust_arch_target_mapping[self.config.arch]
 
     def _find_click_assets(self):
-        return [
-            find(['manifest.json'], self.config.cwd, ignore_dir=self._get_base_build_dir()),
-            find(['.apparmor'], self.config.cwd, ignore_dir=self._get_base_build_dir(), extensions_only=True),
-            find(['.desktop'], self.config.cwd, ignore_dir=self._get_base_build_dir(), extensions_only=True),
-        ]
-
-    def _ignore(self, path, contents):
-        ignored = []
-        for content in contents:
-            abs_path = os.path.abspath(os.path.join(path, content))
-            if (
-                abs_path in self.paths_to_ignore
-                or content in self.paths_to_ignore
-                or os.path.splitext(content)[1] == '.rs'
-            ):
-                ignored += [content]
-        return ignored
+        return find_all([
+            (['manifest.json'], False),
+            (['.apparmor'], True),
+            (['.desktop'], True),
+        ], self.config.cwd, ignore_dir=self._get_base_build_dir(), ignore=self.config.ignore)
 
     def build(self):
         # Remove old artifacts unless the dirty option is active
@@ -75,8 +64,9 @@ class RustBuilder(Builder):
             shutil.rmtree(self.config.install_dir)
 
         # Copy project assets
-        shutil.copytree(self.config.cwd,
-                        self.config.install_dir, ignore=self._ignore)
+        stage_tree(self.config.cwd, self.config.install_dir,
+                   IgnoreMatcher(self.paths_to_ignore, extensions=['.rs']),
+                   get_sync_manifest_path(self.config))
 
         # Copy click assets
         target_dir = self.config.app_bin_dir
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from clickable.logger import logger
+
+
+class ClickCache(object):
+    '''
+    Stores built click packages together with whether they passed the
+    review, keyed by a digest of their payload. The least recently used
+    entries are evicted once the cache grows beyond its size limit.
+    '''
+
+    review_marker = 'review-passed'
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @staticmethod
+    def get_key(install_dir_digest, arch, framework, source_date_epoch=None):
+        key = json.dumps({
+            'install_dir': install_dir_digest,
+            'arch': arch,
+            'framework': framework,
+            'source_date_epoch': source_date_epoch,
+        }, sort_keys=True)
+
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def touch(self, key):
+        os.utime(self.get_entry_dir(key))
+
+    def get(self, key, click):
+        path = os.path.join(self.get_entry_dir(key), click)
+        if not os.path.isfile(path):
+            return None
+
+        self.touch(key)
+        return path
+
+    def put(self, key, click_path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        entry_dir = self.get_entry_dir(key)
+        if os.path.isdir(entry_dir):
+            shutil.rmtree(entry_dir)
+
+        # Copy into a temporary dir first, so that other processes never see
+        # incomplete entries
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp-')
+        shutil.copyfile(click_path, os.path.join(tmp_dir, os.path.basename(click_path)))
+
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another build stored the same package in the meantime
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict()
+
+    def is_reviewed(self, key):
+        return os.path.isfile(os.path.join(self.get_entry_dir(key), self.review_marker))
+
+    def set_reviewed(self, key):
+        entry_dir = self.get_entry_dir(key)
+        if os.path.isdir(entry_dir):
+            open(os.path.join(entry_dir, self.review_marker), 'w').close()
+
+    def get_entry_size(self, entry_dir):
+        size = 0
+        for name in os.listdir(entry_dir):
+            size += os.path.getsize(os.path.join(entry_dir, name))
+
+        return size
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if name.startswith('.') or not os.path.isdir(entry_dir):
+                continue
+
+            entries.append((os.path.getmtime(entry_dir), self.get_entry_size(entry_dir), entry_dir))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            logger.debug('Evicting {} from the click cache'.format(entry_dir))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,313 @@
+import fnmatch
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+
+from clickable.exceptions import ClickableException
+from clickable.logger import logger
+
+
+CLICK_VERSION = '0.4'
+
+# Files left out of the data area, same as "click build" does
+IGNORE_PATTERNS = [
+    '*.click', '.*.sw?', '*~', ',,*', '.[#~]*', '.arch-ids', '.arch-inventory',
+    '.be', '.bzr', '.bzr-builddeb', '.bzr.backup', '.bzr.tags', '.bzrignore',
+    '.cvsignore', '.git', '.gitattributes', '.gitignore', '.gitmodules', '.hg',
+    '.hgignore', '.hgsigs', '.hgtags', '.shelf', '.svn', 'CVS', 'DEADJOE',
+    'RCS', '_MTN', '_darcs', '{arch}',
+]
+
+PREINST = '''#! /bin/sh
+echo "Click packages may not be installed directly using dpkg."
+echo "Use 'click install' instead."
+exit 1
+'''
+
+# Fast levels, the maximum level takes much longer for a few percent of size
+DATA_COMPRESSLEVEL = 6
+CONTROL_COMPRESSLEVEL = 6
+
+REQUIRED_MANIFEST_KEYS = ['name', 'version', 'maintainer', 'title', 'framework']
+
+
+class HashingReader(object):
+    '''
+    File wrapper computing the md5sum of everything read through it, so
+    that files only need to be read once to be packed and hashed.
+    '''
+
+    def __init__(self, f):
+        self.f = f
+        self.md5 = hashlib.md5()
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.md5.update(data)
+        return data
+
+
+def md5_file(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+
+    return md5.hexdigest()
+
+
+def is_ignored(name):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in IGNORE_PATTERNS)
+
+
+class ClickPacker(object):
+    '''
+    Builds a click package from the install dir, like
+    "click build --no-validate", without needing the click tool. A click
+    package is an ar archive of the debian-binary and _click-binary markers,
+    the control area and the data area. The data area is streamed into its
+    tarball while the md5sums for the control area are computed.
+
+    With a source_date_epoch the package is reproducible: all timestamps
+    are clamped to it and permissions are normalised, so that the same
+    install dir always gives the same bytes.
+    '''
+
+    def __init__(self, install_dir, source_date_epoch=None):
+        self.install_dir = os.path.abspath(install_dir)
+        self.source_date_epoch = source_date_epoch
+
+    def get_mtime(self, mtime):
+        if self.source_date_epoch is None:
+            return int(mtime)
+
+        return min(int(mtime), self.source_date_epoch)
+
+    def open_tar(self, fileobj, compresslevel):
+        # No file name and a fixed timestamp in the gzip header
+        gz = gzip.GzipFile(filename='', mode='wb', compresslevel=compresslevel,
+                           fileobj=fileobj, mtime=self.source_date_epoch)
+        tar = tarfile.open(fileobj=gz, mode='w', format=tarfile.GNU_FORMAT)
+        return gz, tar
+
+    def read_manifest(self):
+        path = os.path.join(self.install_dir, 'manifest.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ClickableException('Failed reading "{}": {}'.format(path, e))
+
+        missing = [key for key in REQUIRED_MANIFEST_KEYS if not manifest.get(key, None)]
+        if missing:
+            raise ClickableException('The manifest.json is missing "{}"'.format('", "'.join(missing)))
+
+        return manifest
+
+    def get_architecture(self, manifest):
+        architecture = manifest.get('architecture', 'all')
+        if isinstance(architecture, list):
+            return 'multi'
+
+        return architecture
+
+    def get_tarinfo(self, tar, path, arcname):
+        tarinfo = tar.gettarinfo(path, arcname)
+        tarinfo.uid = tarinfo.gid = 0
+        tarinfo.uname = tarinfo.gname = 'root'
+        tarinfo.mtime = self.get_mtime(tarinfo.mtime)
+
+        if self.source_date_epoch is not None and not tarinfo.issym():
+            executable = tarinfo.isdir() or tarinfo.mode & 0o111
+            tarinfo.mode = 0o755 if executable else 0o644
+
+        return tarinfo
+
+    def list_data(self, path='', entries=None):
+        '''
+        Relative paths of the data area in archive order, i.e. depth first
+        with sorted directory contents, just like tarfile adds them.
+        '''
+
+        if entries is None:
+            entries = []
+
+        for name in sorted(os.listdir(os.path.join(self.install_dir, path))):
+            rel_path = os.path.join(path, name)
+            if is_ignored(name) or rel_path == 'manifest.json':
+                continue
+
+            entries.append(rel_path)
+
+            full_path = os.path.join(self.install_dir, rel_path)
+            if os.path.isdir(full_path) and not os.path.islink(full_path):
+                self.list_data(rel_path, entries)
+
+        return entries
+
+    def write_data(self, fileobj):
+        '''
+        Streams the data area into fileobj. Returns the md5sums lines and
+        the installed size in bytes.
+        '''
+
+        md5sums = []
+        installed_size = 0
+
+        gz, tar = self.open_tar(fileobj, DATA_COMPRESSLEVEL)
+        with gz, tar:
+            tar.addfile(self.get_tarinfo(tar, self.install_dir, './'))
+
+            for rel_path in self.list_data():
+                path = os.path.join(self.install_dir, rel_path)
+                tarinfo = self.get_tarinfo(tar, path, './' + rel_path)
+
+                # Directory sizes depend on the filesystem, leave them out
+                if not tarinfo.isdir():
+                    installed_size += os.lstat(path).st_size
+
+                if tarinfo.isreg():
+                    with open(path, 'rb') as f:
+                        reader = HashingReader(f)
+                        tar.addfile(tarinfo, reader)
+                    md5sums.append('{}  {}'.format(reader.md5.hexdigest(), rel_path))
+                    continue
+
+                tar.addfile(tarinfo)
+                # Links are listed with the content they point to, if there is any
+                if not tarinfo.isdir() and os.path.isfile(path):
+                    md5sums.append('{}  {}'.format(md5_file(path), rel_path))
+
+        return md5sums, installed_size
+
+    def get_control_files(self, manifest, md5sums, installed_size):
+        manifest = dict(manifest)
+        manifest['installed-size'] = str((installed_size + 1023) // 1024)
+
+        control = '\n'.join([
+            'Package: {}'.format(manifest['name']),
+            'Version: {}'.format(manifest['version']),
+            'Click-Version: {}'.format(CLICK_VERSION),
+            'Architecture: {}'.format(self.get_architecture(manifest)),
+            'Maintainer: {}'.format(manifest['maintainer']),
+            'Installed-Size: {}'.format(manifest['installed-size']),
+            'Description: {}'.format(manifest['title']),
+        ]) + '\n'
+
+        manifest_json = json.dumps(manifest, ensure_ascii=False, sort_keys=True,
+                                   indent=4, separators=(',', ': ')) + '\n'
+
+        # Control file names must not contain a dot, hence "manifest"
+        return [
+            ('control', control, 0o644),
+            ('manifest', manifest_json, 0o644),
+            ('md5sums', ''.join(line + '\n' for line in sorted(md5sums)), 0o644),
+            ('preinst', PREINST, 0o755),
+        ]
+
+    def write_control(self, fileobj, files):
+        mtime = self.get_mtime(time.time())
+
+        gz, tar = self.open_tar(fileobj, CONTROL_COMPRESSLEVEL)
+        with gz, tar:
+            tarinfo = tarfile.TarInfo('./')
+            tarinfo.type = tarfile.DIRTYPE
+            tarinfo.mode = 0o755
+            tarinfo.mtime = mtime
+            tarinfo.uname = tarinfo.gname = 'root'
+            tar.addfile(tarinfo)
+
+            for (name, content, mode) in files:
+                data = content.encode('utf-8')
+                tarinfo = tarfile.TarInfo('./' + name)
+                tarinfo.size = len(data)
+                tarinfo.mode = mode
+                tarinfo.mtime = mtime
+                tarinfo.uname = tarinfo.gname = 'root'
+                tar.addfile(tarinfo, io.BytesIO(data))
+
+    def write_ar_member(self, package, name, size, mtime):
+        package.write('{:<16}{:<12}{:<6}{:<6}{:<8}{:<10}`\n'.format(
+            name, mtime, 0, 0, '100644', size).encode())
+
+    def pack(self, click_path):
+        manifest = self.read_manifest()
+
+        tmp_path = '{}.{}.tmp'.format(click_path, os.getpid())
+        data_path = '{}.data'.format(tmp_path)
+        try:
+            with open(data_path, 'wb') as data:
+                md5sums, installed_size = self.write_data(data)
+
+            control = io.BytesIO()
+            self.write_control(control, self.get_control_files(manifest, md5sums, installed_size))
+
+            mtime = self.get_mtime(time.time())
+            members = [
+                ('debian-binary', io.BytesIO(b'2.0\n'), 4),
+                ('_click-binary', io.BytesIO('{}\n'.format(CLICK_VERSION).encode()), len(CLICK_VERSION) + 1),
+                ('control.tar.gz', io.BytesIO(control.getvalue()), len(control.getvalue())),
+                ('data.tar.gz', open(data_path, 'rb'), os.path.getsize(data_path)),
+            ]
+
+            with open(tmp_path, 'wb') as package:
+                package.write(b'!<arch>\n')
+                for (name, fileobj, size) in members:
+                    self.write_ar_member(package, name, size, mtime)
+                    with fileobj:
+                        shutil.copyfileobj(fileobj, package, 1024 * 1024)
+
+                    # Members are aligned to an even offset
+                    if size % 2:
+                        package.write(b'\n')
+
+            os.replace(tmp_path, click_path)
+        finally:
+            for path in [data_path, tmp_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        logger.debug('Packed {} files into {}'.format(len(md5sums), click_path))
+        return click_path
+
+
+def read_control_files(click_path, names):
+    '''
+    Reads files from the control area of a click package.
+    '''
+
+    with open(click_path, 'rb') as f:
+        if f.read(8) != b'!<arch>\n':
+            raise ClickableException('{} is not a click package'.format(click_path))
+
+        while True:
+            header = f.read(60)
+            if len(header) < 60:
+                break
+
+            name = header[:16].decode().strip().rstrip('/')
+            size = int(header[48:58].decode())
+
+            if name.startswith('control.tar'):
+                with tarfile.open(fileobj=io.BytesIO(f.read(size))) as tar:
+                    return {name: tar.extractfile('./' + name).read() for name in names}
+
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+    raise ClickableException('{} has no control area'.format(click_path))
+
+
+def get_control_digest(click_path):
+    '''
+    Digest over the manifest and the md5sums of all files of a click
+    package. Click keeps both in the .click/info dir of installed packages,
+    so the same digest can be computed on the device.
+    '''
+
+    files = read_control_files(click_path, ['manifest', 'md5sums'])
+    return hashlib.sha256(files['manifest'] + files['md5sums']).hexdigest()
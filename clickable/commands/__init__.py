@@ -0,0 +1,52 @@
+import importlib
+
+
+# Command name: (module, class), so that only the commands that are actually
+# run need to be imported
+COMMANDS = {
+    'build': ('build', 'BuildCommand'),
+    'build-libs': ('build_libs', 'LibBuildCommand'),
+    'clean': ('clean', 'CleanCommand'),
+    'clean-build': ('clean_build', 'CleanBuildCommand'),
+    'clean-libs': ('clean_libs', 'CleanLibsCommand'),
+    'click-build': ('click_build', 'ClickBuildCommand'),
+    'create': ('create', 'CreateCommand'),
+    'desktop': ('desktop', 'DesktopCommand'),
+    'devices': ('devices', 'DevicesCommand'),
+    'gdb': ('gdb', 'GdbCommand'),
+    'gdbserver': ('gdbserver', 'GdbserverCommand'),
+    'ide': ('ide', 'IdeCommand'),
+    'install': ('install', 'InstallCommand'),
+    'launch': ('launch', 'LaunchCommand'),
+    'log': ('log', 'LogCommand'),
+    'logs': ('logs', 'LogsCommand'),
+    'no-lock': ('no_lock', 'NoLockCommand'),
+    'publish': ('publish', 'PublishCommand'),
+    'review': ('review', 'ReviewCommand'),
+    'run': ('run', 'RunCommand'),
+    'screenshots': ('screenshots', 'WritableImageCommand'),
+    'setup': ('setup', 'SetupCommand'),
+    'shell': ('shell', 'ShellCommand'),
+    'test': ('test', 'TestCommand'),
+    'test-libs': ('test_libs', 'TestLibsCommand'),
+    'update': ('update', 'UpdateCommand'),
+    'writable-image': ('writable_image', 'WritableImageCommand'),
+}
+
+ALIASES = {
+    'build_click': 'click-build',
+    'build-click': 'click-build',
+    'click_build': 'click-build',
+    'init': 'create',
+    'no_lock': 'no-lock',
+    'ssh': 'shell',
+    'update_docker': 'update',
+    'update-docker': 'update',
+    'writable_image': 'writable-image',
+    'writeable-image': 'writable-image',
+}
+
+
+def get_command_class(name):
+    module, cls = COMMANDS[name]
+    return getattr(importlib.import_module('clickable.commands.{}'.format(module)), cls)
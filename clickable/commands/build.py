@@ -1,15 +1,22 @@
 import os
 import sys
 import shutil
+from collections import OrderedDict
 
 from .base import Command
 from .review import ReviewCommand
 from clickable.utils import (
-    get_builders,
     run_subprocess_check_call,
     makedirs,
     is_sub_dir,
+    hash_tree,
 )
+from clickable.container import Container
+from clickable.builders import get_builder
+from clickable.builders.make import MakeBuilder
+from clickable.build_manifest import create_build_manifest
+from clickable.click_cache import ClickCache
+from clickable.click_packer import ClickPacker
 from clickable.logger import logger
 from clickable.exceptions import ClickableException
 
@@ -19,6 +26,8 @@ class BuildCommand(Command):
     name = 'build'
     help = 'Compile the app'
 
+    click_cache_key = None
+
     def run(self, path_arg=None):
         try:
             os.makedirs(self.config.build_dir, exist_ok=True)
@@ -32,72 +41,220 @@ class BuildCommand(Command):
 
         self.config.container.setup()
 
+        if self.config.incremental:
+            self.config.build_manifest = create_build_manifest(self.config)
+
         if self.config.prebuild:
-            run_subprocess_check_call(self.config.prebuild, cwd=self.config.cwd, shell=True)
+            self.prebuild()
 
         self.build()
 
         self.install_additional_files()
 
         if self.config.postbuild:
-            run_subprocess_check_call(self.config.postbuild, cwd=self.config.build_dir, shell=True)
+            self.postbuild()
 
         self.click_build()
 
         if not self.config.skip_review:
-            review = ReviewCommand(self.config)
-            review.check(self.click_path, raise_on_error=False)
+            self.review()
+
+        if self.config.ccache_dir:
+            logger.info('Compiler cache statistics:')
+            self.config.container.run_command('ccache -s')
+
+    def is_step_up_to_date(self, step, inputs, outputs=[], depends=[]):
+        manifest = self.config.build_manifest
+        return manifest is not None and manifest.is_up_to_date(step, inputs, outputs, depends)
+
+    def record_step(self, step):
+        if self.config.build_manifest:
+            self.config.build_manifest.record(step)
+
+    def prebuild(self):
+        manifest = self.config.build_manifest
+        if manifest:
+            inputs = {
+                'command': self.config.prebuild,
+                'sources': manifest.hash_sources(self.config),
+            }
+            if manifest.is_up_to_date('prebuild', inputs):
+                return
+
+        run_subprocess_check_call(self.config.prebuild, cwd=self.config.cwd, shell=True,
+                env=self.config.get_process_env())
+        self.record_step('prebuild')
 
     def build(self):
-        builder_classes = get_builders()
-        builder = builder_classes[self.config.builder](self.config, self.device)
-        builder.build()
+        builder = get_builder(self.config.builder)(self.config, self.device)
 
-    def install_files(self, pattern, dest_dir):
-        if not is_sub_dir(dest_dir, self.config.install_dir):
-            dest_dir = os.path.abspath(self.config.install_dir + "/" + dest_dir)
-
-        makedirs(dest_dir)
-        if '"' in pattern:
-            # Make sure one cannot run random bash code through the "ls" command
-            raise ClickableException("install_* patterns must not contain any '\"' quotation character.")
-
-        command = 'ls -d "{}"'.format(pattern)
-        files = self.config.container.run_command(command, get_output=True).split()
-
-        logger.info("Installing {}".format(", ".join(files)))
-        self.config.container.pull_files(files, dest_dir)
-
-    def install_qml_files(self, pattern, dest_dir):
-        if '*' in pattern:
-            self.install_files(pattern, dest_dir)
-        else:
-            command = 'cat {}'.format(os.path.join(pattern, 'qmldir'))
-            qmldir = self.config.container.run_command(command, get_output=True)
-            module = None
-            for line in qmldir.split('\n'):
-                if line.startswith('module'):
-                    module = line.split(' ')[1]
-
-            if module:
-                self.install_files(pattern, os.path.join(
-                    dest_dir, *module.split('.')[:-1])
-                )
-            else:
-                self.install_files(pattern, dest_dir)
+        manifest = self.config.build_manifest
+        if not manifest or isinstance(builder, MakeBuilder):
+            # Make based builders track their configure and make steps on their own
+            builder.build()
+            return
+
+        inputs = {'sources': manifest.hash_sources(self.config)}
+        if manifest.is_up_to_date('build', inputs, [self.config.install_dir], depends=['prebuild']):
+            return
+
+        # Start from an empty install dir, just like after cleaning
+        if os.path.isdir(self.config.install_dir):
+            shutil.rmtree(self.config.install_dir)
+
+        builder.build()
+        manifest.record('build')
+
+    def postbuild(self):
+        inputs = {'command': self.config.postbuild}
+        depends = ['prebuild', 'configure', 'make', 'build', 'install_additional_files']
+        if self.is_step_up_to_date('postbuild', inputs, [self.config.install_dir], depends):
+            return
+
+        run_subprocess_check_call(self.config.postbuild, cwd=self.config.build_dir, shell=True,
+                env=self.config.get_process_env())
+        self.record_step('postbuild')
+
+    def review(self):
+        manifest = self.config.build_manifest
+        if manifest:
+            inputs = {'click': manifest.hash_file(self.click_path)}
+            if manifest.is_up_to_date('review', inputs, depends=['click_build']):
+                return
+
+        cache = self.get_click_cache()
+        if cache and cache.is_reviewed(self.click_cache_key):
+            logger.info('Skipping review, the click package passed it before')
+            return
+
+        review = ReviewCommand(self.config)
+        returncode = review.check(self.click_path, raise_on_error=False)
+
+        # Keep showing errors and warnings until they got fixed
+        if returncode == 0:
+            self.record_step('review')
+
+            if cache:
+                cache.set_reviewed(self.click_cache_key)
+
+    def resolve_install_patterns(self, patterns, qml_modules):
+        """
+        Expands all install patterns and reads the qmldir of all qml modules
+        with a single bash command inside the container, so that the patterns
+        support everything bash expands (globs, braces, ~ and variables).
+        Each output line is prefixed with the index of its pattern or module.
+        """
+        script = ['shopt -s nullglob']
+        for index, pattern in enumerate(patterns):
+            script.append(
+                "for f in {}; do if [ -e \\\"$f\\\" ] || [ -L \\\"$f\\\" ]; then printf 'f{} %s\\n' \\\"$f\\\"; fi; done".format(
+                    pattern, index))
+        for index, module in enumerate(qml_modules):
+            script.append("if sed 's/^/q{0} /' {1}/qmldir 2>/dev/null; then echo r{0}; fi".format(index, module))
+
+        output = self.config.container.run_command('; '.join(script), get_output=True)
+
+        files = [[] for pattern in patterns]
+        qmldirs = [None for module in qml_modules]
+        for line in output.split('\n'):
+            prefix, _, value = line.partition(' ')
+            kind, index = prefix[:1], prefix[1:]
+            if not index.isdigit():
+                continue
+
+            index = int(index)
+            if kind == 'f' and index < len(patterns):
+                files[index].append(value)
+            elif kind == 'q' and index < len(qml_modules):
+                qmldirs[index] = (qmldirs[index] or '') + value + '\n'
+            elif kind == 'r' and index < len(qml_modules):
+                qmldirs[index] = qmldirs[index] or ''
+
+        return {
+            'files': dict(zip(patterns, files)),
+            'qml_modules': dict(zip(qml_modules, qmldirs)),
+        }
+
+    def get_qml_module_dest(self, qmldir, dest_dir):
+        module = None
+        for line in qmldir.split('\n'):
+            if line.startswith('module'):
+                module = line.split(' ')[1]
+
+        if module:
+            return os.path.join(dest_dir, *module.split('.')[:-1])
+
+        return dest_dir
+
+    def get_install_patterns(self):
+        lib_dir = os.path.join(self.config.install_dir, self.config.app_lib_dir)
+        bin_dir = os.path.join(self.config.install_dir, self.config.app_bin_dir)
+        qml_dir = os.path.join(self.config.install_dir, self.config.app_qml_dir)
+
+        patterns = []
+        patterns.extend([(p, lib_dir, False) for p in self.config.install_lib])
+        patterns.extend([(p, bin_dir, False) for p in self.config.install_bin])
+        patterns.extend([(p, qml_dir, '*' not in p) for p in self.config.install_qml])
+        patterns.extend([(p, dest, False) for p, dest in self.config.install_data.items()])
+
+        return patterns
+
+    def plan_install_files(self):
+        patterns = self.get_install_patterns()
+        if not patterns:
+            return OrderedDict()
+
+        for pattern, _, _ in patterns:
+            if '"' in pattern:
+                # Make sure one cannot run random bash code through the resolve command
+                raise ClickableException("install_* patterns must not contain any '\"' quotation character.")
+
+        resolved = self.resolve_install_patterns(
+            [pattern for pattern, _, _ in patterns],
+            [pattern for pattern, _, is_module in patterns if is_module],
+        )
+
+        plan = OrderedDict()
+        for pattern, dest_dir, is_module in patterns:
+            if not is_sub_dir(dest_dir, self.config.install_dir):
+                dest_dir = os.path.abspath(self.config.install_dir + "/" + dest_dir)
+
+            if is_module:
+                qmldir = resolved['qml_modules'][pattern]
+                if qmldir is None:
+                    raise ClickableException('Could not read the qmldir of the qml module "{}"'.format(pattern))
+
+                dest_dir = self.get_qml_module_dest(qmldir, dest_dir)
+
+            files = resolved['files'][pattern]
+            if not files:
+                raise ClickableException('No files found matching the install pattern "{}"'.format(pattern))
+
+            plan.setdefault(dest_dir, []).extend(files)
+
+        return plan
 
     def install_additional_files(self):
-        for p in self.config.install_lib:
-            self.install_files(p, os.path.join(self.config.install_dir,
-                                               self.config.app_lib_dir))
-        for p in self.config.install_bin:
-            self.install_files(p, os.path.join(self.config.install_dir,
-                                               self.config.app_bin_dir))
-        for p in self.config.install_qml:
-            self.install_qml_files(p, os.path.join(self.config.install_dir,
-                                               self.config.app_qml_dir))
-        for p, dest in self.config.install_data.items():
-            self.install_files(p, dest)
+        inputs = {'patterns': self.get_install_patterns()}
+        depends = ['prebuild', 'configure', 'make', 'build']
+        if not inputs['patterns'] or self.is_step_up_to_date(
+                'install_additional_files', inputs, [self.config.install_dir], depends):
+            return
+
+        plan = self.plan_install_files()
+
+        try:
+            for dest_dir, files in plan.items():
+                makedirs(dest_dir)
+
+                logger.info("Installing {}".format(", ".join(files)))
+                self.config.container.pull_files(files, dest_dir)
+        finally:
+            # The helper container used for pulling files is not needed anymore
+            if not self.config.persistent_container:
+                Container.stop_sessions(self.config.build_arch)
+
+        self.record_step('install_additional_files')
 
     def set_arch(self, manifest):
         arch = manifest.get('architecture', None)
@@ -138,15 +295,64 @@ class BuildCommand(Command):
         if has_changed:
             self.config.install_files.write_manifest(manifest)
 
+    def get_source_date_epoch(self):
+        if self.config.source_date_epoch is not None:
+            return self.config.source_date_epoch
+
+        if self.config.reproducible:
+            return 0
+
+        return None
+
+    def get_click_cache(self):
+        if not self.click_cache_key:
+            return None
+
+        return ClickCache(
+            os.path.expanduser('~/.clickable/cache/clicks'),
+            self.config.click_cache_size * 1024 * 1024,
+        )
+
+    def build_click(self, click):
+        cache = self.get_click_cache()
+        if cache:
+            cached_click = cache.get(self.click_cache_key, click)
+            if cached_click:
+                logger.info('Using cached click package {}'.format(click))
+                shutil.copyfile(cached_click, self.click_path)
+                return
+
+        ClickPacker(self.config.install_dir, self.get_source_date_epoch()).pack(self.click_path)
+
+        if cache:
+            cache.put(self.click_cache_key, self.click_path)
+
     def click_build(self):
         self.manipulate_manifest()
 
-        command = 'click build {} --no-validate'.format(self.config.install_dir)
-        self.config.container.run_command(command)
-
         click = self.config.install_files.get_click_filename()
         self.click_path = os.path.join(self.config.build_dir, click)
 
+        manifest = self.config.build_manifest
+        install_dir_digest = None
+        if manifest:
+            install_dir_digest = manifest.hash_tree(self.config.install_dir)
+        elif self.config.click_cache:
+            install_dir_digest = hash_tree(self.config.install_dir)
+
+        if self.config.click_cache:
+            self.click_cache_key = ClickCache.get_key(
+                install_dir_digest, self.config.arch, self.config.framework,
+                self.get_source_date_epoch())
+
+        inputs = {
+            'install_dir': install_dir_digest,
+            'source_date_epoch': self.get_source_date_epoch(),
+        }
+        if not self.is_step_up_to_date('click_build', inputs, [self.click_path]):
+            self.build_click(click)
+            self.record_step('click_build')
+
         if self.config.click_output:
             output_file = os.path.join(self.config.click_output, click)
 
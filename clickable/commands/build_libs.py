@@ -1,10 +1,13 @@
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from .base import Command
-from clickable.logger import logger
-from clickable.utils import get_builders, run_subprocess_check_call
+from clickable.logger import logger, get_log_prefix, set_log_prefix
+from clickable.utils import run_subprocess_check_call
+from clickable.builders import get_builder
 from clickable.container import Container
+from clickable.build_manifest import create_build_manifest, get_build_manifest_path, BuildManifest
 from clickable.exceptions import ClickableException
 
 
@@ -18,45 +21,131 @@ class LibBuildCommand(Command):
             logger.warning('No libraries defined.')
 
         single_lib = path_arg
-        found = False
+        libs = [lib for lib in self.config.lib_configs if not single_lib or single_lib == lib.name]
 
-        for lib in self.config.lib_configs:
-            if not single_lib or single_lib == lib.name:
-                logger.info("Building {}".format(lib.name))
-                found = True
+        if single_lib and not libs:
+            raise ClickableException('Cannot build unknown library {}, which is not in your clickable.json'.format(single_lib))
 
-                lib.container_mode = self.config.container_mode
-                lib.docker_image = self.config.docker_image
-                lib.build_arch = self.config.build_arch
-                lib.container = Container(lib, lib.name)
-                lib.container.setup()
+        self.build_libs(libs)
 
-                # This is a workaround for lib env vars being overwritten by
-                # project env vars, especially affecting Container Mode.
-                lib.set_env_vars()
+        if self.config.ccache_dir and libs:
+            logger.info('Compiler cache statistics:')
+            libs[0].container.run_command('ccache -s')
 
-                try:
-                    os.makedirs(lib.build_dir, exist_ok=True)
-                except Exception:
-                    logger.warning('Failed to create the build directory: {}'.format(str(sys.exc_info()[0])))
+    def build_libs(self, libs):
+        '''
+        Builds the libs on up to lib_jobs workers. A lib is started as soon
+        as all libs it depends on are built, libs that are not part of this
+        run are considered to be built already.
+        '''
 
-                try:
-                    os.makedirs(lib.build_home, exist_ok=True)
-                except Exception:
-                    logger.warning('Failed to create the build home directory: {}'.format(str(sys.exc_info()[0])))
+        names = [lib.name for lib in libs]
+        pending = [lib for lib in libs]
+        dependencies = {
+            lib.name: set(dependency for dependency in lib.depends_on if dependency in names)
+            for lib in libs
+        }
+        done = set()
+        running = {}
+        error = None
 
-                if lib.prebuild:
-                    run_subprocess_check_call(lib.prebuild, cwd=self.config.cwd, shell=True)
+        jobs = self.config.lib_jobs
+        prefix = get_log_prefix()
 
-                self.build(lib)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                for lib in [lib for lib in pending if dependencies[lib.name] <= done]:
+                    pending.remove(lib)
 
-                if lib.postbuild:
-                    run_subprocess_check_call(lib.postbuild, cwd=lib.build_dir, shell=True)
+                    # Worker threads don't inherit the log prefix
+                    lib_prefix = prefix
+                    if jobs > 1:
+                        lib_prefix = '{} {}'.format(prefix, lib.name) if prefix else lib.name
 
-        if single_lib and not found:
-            raise ClickableException('Cannot build unknown library {}, which is not in your clickable.json'.format(single_lib))
+                    running[executor.submit(self.build_lib, lib, lib_prefix)] = lib
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    lib = running.pop(future)
+
+                    if future.exception():
+                        logger.error('Building {} failed'.format(lib.name))
+                        error = error or future.exception()
+
+                        # Let running builds finish, but don't start new ones
+                        pending = []
+                    else:
+                        done.add(lib.name)
+                        logger.info('Finished building {} ({}/{})'.format(lib.name, len(done), len(libs)))
+
+        if error:
+            raise error
+
+    def build_lib(self, lib, prefix=None):
+        set_log_prefix(prefix)
+
+        try:
+            logger.info("Building {}".format(lib.name))
+
+            lib.container_mode = self.config.container_mode
+            lib.persistent_container = self.config.persistent_container
+            lib.docker_image = self.config.docker_image
+            lib.build_arch = self.config.build_arch
+            lib.container = Container(lib, lib.name)
+            lib.container.setup()
+
+            manifest = create_build_manifest(lib)
+            if self.config.incremental:
+                lib.build_manifest = manifest
+
+            step = 'lib {}'.format(lib.name)
+            inputs = {
+                'sources': manifest.hash_sources(lib),
+                'qt_version': lib.qt_version,
+                'dependencies': self.get_dependency_stamps(lib),
+            }
+            if manifest.is_up_to_date(step, inputs, outputs=[lib.install_dir], force=self.config.force_build):
+                return
+
+            try:
+                os.makedirs(lib.build_dir, exist_ok=True)
+            except Exception:
+                logger.warning('Failed to create the build directory: {}'.format(str(sys.exc_info()[0])))
+
+            try:
+                os.makedirs(lib.build_home, exist_ok=True)
+            except Exception:
+                logger.warning('Failed to create the build home directory: {}'.format(str(sys.exc_info()[0])))
+
+            if lib.prebuild:
+                run_subprocess_check_call(lib.prebuild, cwd=self.config.cwd, shell=True,
+                        env=lib.get_process_env())
+
+            self.build(lib)
+
+            if lib.postbuild:
+                run_subprocess_check_call(lib.postbuild, cwd=lib.build_dir, shell=True,
+                        env=lib.get_process_env())
+
+            manifest.record(step)
+        finally:
+            set_log_prefix(None)
+
+    def get_dependency_stamps(self, lib):
+        '''
+        Digests of the last builds of all libs this lib depends on, so that
+        it gets rebuilt whenever one of them changed.
+        '''
+
+        libs = {l.name: l for l in self.config.lib_configs}
+
+        stamps = {}
+        for dependency in lib.depends_on:
+            manifest = BuildManifest(get_build_manifest_path(libs[dependency]))
+            stamps[dependency] = manifest.steps.get('lib {}'.format(dependency), None)
+
+        return stamps
 
     def build(self, lib):
-        builder_classes = get_builders()
-        builder = builder_classes[lib.builder](lib, None)
+        builder = get_builder(lib.builder)(lib, None)
         builder.build()
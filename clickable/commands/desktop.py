@@ -45,7 +45,7 @@ class DesktopCommand(Command):
         if self.config.desktop_skip_build or self.custom_mode:
             self.config.container.setup()
         else:
-            if not self.config.dirty:
+            if not self.config.dirty and not self.config.incremental:
                 CleanCommand(self.config).run()
             BuildCommand(self.config).run()
 
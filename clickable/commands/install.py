@@ -2,6 +2,8 @@ import os
 import subprocess
 
 from .base import Command
+from clickable.click_packer import get_control_digest
+from clickable.exceptions import ClickableException
 from clickable.utils import run_subprocess_check_call
 from clickable.logger import logger
 
@@ -11,17 +13,31 @@ class InstallCommand(Command):
     name = 'install'
     help = 'Takes a built click package and installs it on a device'
 
-    def try_find_installed_version(self, package_name):
+    def try_find_installed_package(self, package_name):
+        '''
+        Finds the installed version and the digest of its manifest and
+        md5sums (see get_control_digest) with a single device command.
+        '''
+
+        info_dir = '/opt/click.ubuntu.com/{0}/current/.click/info/{0}'.format(package_name)
+        command = 'readlink /opt/click.ubuntu.com/{0}/current && cat {1}.manifest {1}.md5sums | sha256sum'.format(
+            package_name, info_dir)
+
         try:
-            response = self.device.run_command('readlink /opt/click.ubuntu.com/{}/current'.format(package_name), get_output=True)
-            return response.splitlines()[-1]
+            response = self.device.run_command(command, get_output=True)
+            version, digest = response.splitlines()[-2:]
+            return version, digest.split()[0]
         except:
-            return None
+            return None, None
 
-    def try_uninstall(self):
-        package_name = self.config.install_files.find_package_name()
-        version = self.try_find_installed_version(package_name)
+    def try_get_click_digest(self, click_path):
+        try:
+            return get_control_digest(click_path)
+        except (OSError, ClickableException) as e:
+            logger.debug('Failed to read the click package {}: {}'.format(click_path, e))
+            return None
 
+    def try_uninstall(self, package_name, version):
         if version:
             self.device.run_command('pkcon remove \\"{};{};all;local:click\\"'.format(package_name, version))
 
@@ -42,6 +58,12 @@ class InstallCommand(Command):
             click_path = os.path.join(self.config.build_dir, click)
             cwd = self.config.build_dir
 
+            package_name = self.config.install_files.find_package_name()
+            version, digest = self.try_find_installed_package(package_name)
+            if digest and digest == self.try_get_click_digest(click_path):
+                logger.info('The same click package is installed on the device already, skipping the install')
+                return
+
         if self.config.ssh:
             command = 'scp {} phablet@{}:/home/phablet/'.format(click_path, self.config.ssh)
             run_subprocess_check_call(command, cwd=cwd, shell=True)
@@ -60,7 +82,7 @@ class InstallCommand(Command):
         if path_arg:
             logger.info("Skipping uninstall step, because you specified a click package.")
         else:
-            self.try_uninstall()
+            self.try_uninstall(package_name, version)
 
         self.device.run_command('pkcon install-local --allow-untrusted /home/phablet/{}'.format(click), cwd=cwd)
         self.device.run_command('rm /home/phablet/{}'.format(click), cwd=cwd)
@@ -1,3 +1,4 @@
+import json
 import os
 import urllib.parse
 
@@ -10,11 +11,38 @@ except ImportError:
 from .base import Command
 from clickable.logger import logger
 from clickable.exceptions import ClickableException
+from clickable.utils import hash_file
 
 
 OPENSTORE_API = 'https://open-store.io'
 OPENSTORE_API_PATH = '/api/v3/manage/{}/revision'
 
+# Digest and changelog of the last click package uploaded per store url, channel and architecture
+published_clicks = os.path.expanduser('~/.clickable/published_clicks.json')
+
+
+def load_published_clicks():
+    if not os.path.isfile(published_clicks):
+        return {}
+
+    with open(published_clicks, 'r') as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+
+def remember_published_click(key, click):
+    published = load_published_clicks()
+    published[key] = click
+
+    try:
+        os.makedirs(os.path.dirname(published_clicks), exist_ok=True)
+        with open(published_clicks, 'w') as f:
+            json.dump(published, f)
+    except OSError as e:
+        logger.debug('Failed to remember the published click: {}'.format(e))
+
 
 class PublishCommand(Command):
     aliases = []
@@ -38,6 +66,15 @@ class PublishCommand(Command):
         package_name = self.config.install_files.find_package_name()
         url = url + OPENSTORE_API_PATH.format(package_name)
         channel = 'xenial'
+
+        # Reproducible builds of unchanged sources give the very same package
+        published = {'click': hash_file(click_path), 'changelog': path_arg}
+        published_key = '{} {} {}'.format(url, channel, self.config.arch)
+        if not self.config.force_build and load_published_clicks().get(published_key, None) == published:
+            logger.info('This click package was uploaded to the OpenStore before, skipping the upload. '
+                        'Run "clickable publish --force" to upload it anyway')
+            return
+
         files = {'file': open(click_path, 'rb')}
         data = {
             'channel': channel,
@@ -54,6 +91,7 @@ class PublishCommand(Command):
         response = requests.post(url, files=files, data=data, params=params)
         if response.status_code == requests.codes.ok:
             logger.info('Upload successful')
+            remember_published_click(published_key, published)
         elif response.status_code == requests.codes.not_found:
             title = urllib.parse.quote(self.config.install_files.find_package_title())
             raise ClickableException(
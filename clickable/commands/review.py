@@ -23,11 +23,13 @@ class ReviewCommand(Command):
             self.config.container.run_command('click-review {}'.format(click_path), use_build_dir=False, cwd=cwd)
         except subprocess.CalledProcessError as e:
             if e.returncode == 2 and not raise_on_error:
-                pass
+                return e.returncode
             elif e.returncode == 3 and not raise_on_warning:
-                pass
+                return e.returncode
             else:
                 raise e
 
+        return 0
+
     def run(self, path_arg=None):
         self.check(path_arg)
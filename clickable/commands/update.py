@@ -1,18 +1,13 @@
-import subprocess
-import shlex
-
 from clickable.config.constants import Constants
 from .base import Command
 from clickable.utils import (
-    run_subprocess_check_call,
-    run_subprocess_check_output,
     image_exists,
+    pull_image,
 )
 
 def update_image(image):
     if image_exists(image):
-        command = 'docker pull {}'.format(image)
-        run_subprocess_check_call(command)
+        pull_image(image)
 
 
 class UpdateCommand(Command):
@@ -0,0 +1,78 @@
+import json
+import os
+
+from clickable.commands import COMMANDS
+
+
+CLI_ARGS = [
+    '--serial-number', '--config', '--ssh', '--arch',
+    '--verbose', '--container-mode', '--apikey',
+    '--docker-image', '--dirty', '--incremental', '--debug', '--ccache', '--apt-cache',
+    '--persistent-container', '--click-cache', '--force', '--reproducible',
+]
+
+DESKTOP_CLI_ARGS = [
+    '--nvidia', '--no-nvidia', '--gdbserver', '--gdb',
+    '--dark-mode', '--lang', '--skip-build', '--dirty',
+    '--incremental', '--verbose', '--config',
+]
+
+completion_cache = os.path.expanduser('~/.clickable/completion_cache.json')
+
+
+def load_completion_cache():
+    if not os.path.isfile(completion_cache):
+        return {}
+
+    with open(completion_cache, 'r') as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+
+def get_script_names(config_path):
+    '''
+    Names of the custom scripts in the given clickable.json, cached by the
+    file's mtime, so that a TAB press does not need to load the config.
+    '''
+
+    try:
+        mtime = os.stat(config_path).st_mtime_ns
+    except OSError:
+        return []
+
+    cache = load_completion_cache()
+    entry = cache.get(config_path, None)
+    if entry and entry.get('mtime', None) == mtime:
+        return entry.get('scripts', [])
+
+    scripts = []
+    with open(config_path, 'r') as f:
+        try:
+            config = json.load(f)
+        except ValueError:
+            config = {}
+
+    if isinstance(config, dict) and isinstance(config.get('scripts', None), dict):
+        scripts = sorted(config['scripts'].keys())
+
+    cache[config_path] = {'mtime': mtime, 'scripts': scripts}
+    try:
+        os.makedirs(os.path.dirname(completion_cache), exist_ok=True)
+        with open(completion_cache, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
+    return scripts
+
+
+def get_completion_words(command, config_path=None, cwd=None):
+    if command == 'bash-completion-desktop':
+        return sorted(DESKTOP_CLI_ARGS)
+
+    if not config_path:
+        config_path = os.path.join(cwd if cwd else os.getcwd(), 'clickable.json')
+
+    return sorted(list(COMMANDS) + get_script_names(os.path.abspath(config_path)) + CLI_ARGS)
@@ -15,6 +15,8 @@ class Constants(object):
 
     builders = [PURE_QML_QMAKE, QMAKE, PURE_QML_CMAKE, CMAKE, CUSTOM, CORDOVA, PURE, PYTHON, GO, RUST, PRECOMPILED]
     arch_agnostic_builders = [PURE_QML_QMAKE, PURE_QML_CMAKE, PURE]
+    # Builders which only copy files, the click package is packed without a container
+    container_free_builders = [PURE, PYTHON, PRECOMPILED]
 
     container_mapping = {
         "armhf": {
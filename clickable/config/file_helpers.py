@@ -13,6 +13,8 @@ class ProjectFiles(object):
     def __init__(self, project_dir):
         self.project_dir = project_dir
         self.desktop = None
+        # The "ignore" config, set once the config is loaded
+        self.ignore = []
 
     def find_any_desktop(self, temp_dir=None, build_dir=None):
         if self.desktop is not None:
@@ -21,7 +23,7 @@ class ProjectFiles(object):
         self.desktop = {}
 
         desktop_file = find(['.desktop', '.desktop.in', '.desktop.in.in'],
-                self.project_dir, temp_dir, build_dir, extensions_only=True, depth=3)
+                self.project_dir, temp_dir, build_dir, extensions_only=True, depth=3, ignore=self.ignore)
 
         if desktop_file:
             with open(desktop_file, 'r') as f:
@@ -7,9 +7,10 @@ from clickable.utils import (
 )
 from clickable.exceptions import ClickableException
 from clickable.logger import logger
+from clickable.system.resources import get_job_budget
 from .constants import Constants
+from .placeholders import Placeholders
 from collections import OrderedDict
-import multiprocessing
 import platform
 
 
@@ -36,22 +37,30 @@ class LibConfig(object):
     required = ['builder']
     flexible_lists = ['dependencies_host', 'dependencies_target',
                       'dependencies_ppa', 'dependencies_build',
-                      'build_args', 'make_args']
+                      'build_args', 'make_args', 'depends_on']
     builders = [Constants.QMAKE, Constants.CMAKE, Constants.CUSTOM]
 
     first_docker_info = True
     container_mode = False
+    persistent_container = False
+    build_manifest = None
+    ccache_dir = None
+    apt_cache_dir = None
+    apt_update_max_age = 0
     use_nvidia = False
     gopath = None
     verbose = False
+    parallel_builds = 1
 
-    def __init__(self, name, json_config, arch, root_dir, qt_version, debug_build, verbose):
+    def __init__(self, name, json_config, arch, root_dir, qt_version, debug_build, verbose,
+            parallel_builds=1):
         # Must come after ARCH_TRIPLET to avoid breaking it
         self.placeholders.update({"ARCH": "arch"})
 
         self.qt_version = qt_version
         self.debug_build = debug_build
         self.verbose = verbose
+        self.parallel_builds = parallel_builds
 
         self.set_host_arch()
         self.container_list = list(Constants.container_mapping[self.host_arch].values())
@@ -82,6 +91,7 @@ class LibConfig(object):
             'install_dir': '${BUILD_DIR}/install',
             'image_setup': {},
             'test': 'ctest',
+            'depends_on': [],
         }
 
         # TODO remove support for deprecated "template" in clickable.json
@@ -135,12 +145,24 @@ class LibConfig(object):
     def set_env_vars(self):
         os.environ.update(self.get_env_vars())
 
+    def get_process_env(self):
+        # Passed to host processes explicitly, os.environ is shared by parallel builds
+        env = os.environ.copy()
+        env.update(self.get_env_vars())
+        return env
+
     def get_env_vars(self):
         env_vars = {}
 
         if self.debug_build:
             env_vars['DEBUG_BUILD'] = '1'
 
+        env_vars['CARGO_BUILD_JOBS'] = str(self.config['make_jobs'])
+        env_vars['GOMAXPROCS'] = str(self.config['make_jobs'])
+
+        if self.ccache_dir:
+            env_vars['CCACHE_DIR'] = self.get_ccache_env_dir()
+
         for key, conf in self.placeholders.items():
             env_vars[key] = self.config[conf]
 
@@ -148,28 +170,23 @@ class LibConfig(object):
 
         return env_vars
 
-    def substitute(self, sub, rep, key):
-        if self.config[key]:
-            if isinstance(self.config[key], dict):
-                self.config[key] = {k: val.replace(sub, rep) for (k, val) in self.config[key].items()}
-            elif isinstance(self.config[key], list):
-                self.config[key] = [val.replace(sub, rep) for val in self.config[key]]
-            else:
-                self.config[key] = self.config[key].replace(sub, rep)
+    def add_ccache_dependency(self):
+        if 'ccache' not in self.config['dependencies_host']:
+            self.config['dependencies_host'].append('ccache')
+
+    def get_ccache_env_dir(self):
+        return self.ccache_dir if self.container_mode else '/ccache'
 
     def substitute_placeholders(self):
-        for key in self.accepts_placeholders:
-            for sub in self.placeholders:
-                rep = self.config[self.placeholders[sub]]
-                self.substitute("${"+sub+"}", rep, key)
-                # TODO remove deprecated syntax $VAR
-                self.substitute("$"+sub, rep, key)
+        def make_path_absolute(key):
             if key in self.path_keys and self.config[key]:
                 self.config[key] = make_absolute(self.config[key])
 
+        Placeholders(self.placeholders).resolve(self.config, self.accepts_placeholders, make_path_absolute)
+
     def cleanup_config(self):
         if not self.config['make_jobs']:
-            self.config['make_jobs'] = multiprocessing.cpu_count()
+            self.config['make_jobs'] = get_job_budget(self.parallel_builds)
         self.make_args = merge_make_jobs_into_args(
             make_args=self.make_args, make_jobs=self.make_jobs)
 
@@ -205,6 +222,9 @@ class LibConfig(object):
         if not self.host_arch:
             raise ClickableException("No support for host architecture {}".format(host))
 
+    def is_container_free_build(self):
+        return False
+
     def needs_clickable_image(self):
         return not self.container_mode and not self.is_custom_docker_image
 
@@ -0,0 +1,103 @@
+import re
+
+from clickable.exceptions import ClickableException
+
+
+class Placeholders(object):
+    '''
+    Substitutes the ``${NAME}`` placeholders (and the deprecated ``$NAME``
+    syntax) of a config in a single pass per value, using one compiled
+    regex and a lookup of the placeholder's config key.
+    '''
+
+    def __init__(self, placeholders):
+        # Maps placeholder names to the config keys providing their values
+        self.placeholders = dict(placeholders)
+
+        # Longest names first, so that $ARCH does not match the start of $ARCH_TRIPLET
+        names = sorted(self.placeholders, key=len, reverse=True)
+        alternatives = '|'.join(re.escape(name) for name in names)
+        # TODO remove deprecated syntax $VAR
+        self.pattern = re.compile(r'\$\{(' + alternatives + r')\}|\$(' + alternatives + r')') if names else None
+
+    def get_values(self, value):
+        if not value:
+            return []
+        if isinstance(value, dict):
+            return list(value.values())
+        if isinstance(value, list):
+            return value
+        return [value]
+
+    def get_references(self, value):
+        '''
+        Config keys referenced through placeholders in the given value.
+        '''
+
+        references = []
+        if not self.pattern:
+            return references
+
+        for val in self.get_values(value):
+            for match in self.pattern.finditer(val):
+                key = self.placeholders[match.group(1) or match.group(2)]
+                if key not in references:
+                    references.append(key)
+
+        return references
+
+    def substitute(self, value, config):
+        if not value or not self.pattern:
+            return value
+
+        def replace(match):
+            return str(config[self.placeholders[match.group(1) or match.group(2)]])
+
+        if isinstance(value, dict):
+            return {k: self.pattern.sub(replace, val) for (k, val) in value.items()}
+        if isinstance(value, list):
+            return [self.pattern.sub(replace, val) for val in value]
+        return self.pattern.sub(replace, value)
+
+    def get_resolution_order(self, config, keys):
+        '''
+        Orders the keys accepting placeholders so that each key comes after
+        the keys its placeholders refer to. Keeps the given order otherwise.
+        '''
+
+        dependencies = {
+            key: [ref for ref in self.get_references(config[key]) if ref in keys]
+            for key in keys
+        }
+
+        # Depth first search, keys on the stack are still being visited
+        order = []
+
+        def visit(key, stack):
+            if key in stack:
+                cycle = stack[stack.index(key):] + [key]
+                raise ClickableException('Placeholders have a circular reference: {}'.format(' -> '.join(cycle)))
+
+            if key in order:
+                return
+
+            for dependency in dependencies[key]:
+                visit(dependency, stack + [key])
+
+            order.append(key)
+
+        for key in keys:
+            visit(key, [])
+
+        return order
+
+    def resolve(self, config, keys, on_resolved=None):
+        '''
+        Substitutes the placeholders in the given config keys in dependency
+        order. `on_resolved` is called with each key after its substitution.
+        '''
+
+        for key in self.get_resolution_order(config, keys):
+            config[key] = self.substitute(config[key], config)
+            if on_resolved:
+                on_resolved(key)
@@ -1,13 +1,15 @@
 import os
 import json
+import hashlib
 import platform
 import re
-import multiprocessing
 import xml.etree.ElementTree as ElementTree
 from collections import OrderedDict
 
 from clickable.system.queries.nvidia_drivers_in_use import NvidiaDriversInUse
+from clickable.system.resources import get_job_budget
 from .libconfig import LibConfig
+from .placeholders import Placeholders
 from .file_helpers import InstallFiles, ProjectFiles
 from .constants import Constants
 
@@ -25,6 +27,8 @@ from ..logger import logger, Colors
 from clickable.exceptions import ClickableException
 
 
+config_validation_cache = os.path.expanduser('~/.clickable/validated_configs.json')
+
 class ProjectConfig(object):
     config = {}
 
@@ -36,11 +40,16 @@ class ProjectConfig(object):
         'CLICKABLE_BUILD_DIR': 'build_dir',
         'CLICKABLE_DEFAULT': 'default',
         'CLICKABLE_MAKE_JOBS': 'make_jobs',
+        'CLICKABLE_LIB_JOBS': 'lib_jobs',
         'GOPATH': 'gopath',
         'CLICKABLE_DOCKER_IMAGE': 'docker_image',
         'CLICKABLE_BUILD_ARGS': 'build_args',
         'CLICKABLE_MAKE_ARGS': 'make_args',
         'CLICKABLE_DIRTY': 'dirty',
+        'CLICKABLE_INCREMENTAL': 'incremental',
+        'CLICKABLE_CCACHE': 'ccache',
+        'CLICKABLE_APT_CACHE': 'apt_cache',
+        'CLICKABLE_APT_UPDATE_MAX_AGE': 'apt_update_max_age',
         'CLICKABLE_TEST': 'test',
     }
 
@@ -92,17 +101,28 @@ class ProjectConfig(object):
     dark_mode = False
     interactive = True
     skip_review = False
+    persistent_container = False
+    build_manifest = None
+    click_cache = False
+    force_build = False
+    ccache_dir = None
+    apt_cache_dir = None
+    click_cache_size = 1024
+    reproducible = False
+    source_date_epoch = None
+    parallel_builds = 1
     desktop_locale = os.getenv('LANG', 'C')
     desktop_skip_build = False
 
     def __init__(self, args=None, clickable_version=None, commands=[],
-            cwd=None):
+            cwd=None, parallel_builds=1):
         self.placeholders = {}
         self.placeholders.update(ProjectConfig.static_placeholders)
         # TODO move to static_placeholders after removing deprecated $VAR syntax
         self.placeholders.update({"ARCH": "arch"})
 
         self.clickable_version = clickable_version
+        self.parallel_builds = parallel_builds
         self.set_host_arch()
         self.cwd = cwd if cwd else os.getcwd()
         self.project_files = ProjectFiles(self.cwd)
@@ -150,6 +170,7 @@ class ProjectConfig(object):
             'app_qml_dir': '${INSTALL_DIR}/lib/${ARCH_TRIPLET}',
             'ignore': [],
             'make_jobs': None,
+            'lib_jobs': 1,
             'gopath': None,
             'cargo_home': os.path.expanduser('~/.clickable/cargo'),
             'docker_image': None,
@@ -158,6 +179,10 @@ class ProjectConfig(object):
             'env_env_vars': {},
             'make_args': [],
             'dirty': False,
+            'incremental': False,
+            'ccache': False,
+            'apt_cache': False,
+            'apt_update_max_age': 0,
             'libraries': {},
             'test': 'qmltestrunner',
             'install_dir': '${BUILD_DIR}/install',
@@ -192,7 +217,10 @@ class ProjectConfig(object):
             self.config.update(arg_config)
 
         self.config['default'] = flexible_string_to_list(self.config['default'])
-        if self.config['dirty'] and 'clean' in self.config['default']:
+        # Desktop files are already looked up while setting conditional defaults
+        self.config['ignore'] = flexible_string_to_list(self.config['ignore'])
+        self.project_files.ignore = self.config['ignore']
+        if (self.config['dirty'] or self.config['incremental']) and 'clean' in self.config['default']:
             self.config['default'].remove('clean')
 
         self.commands = commands if commands else self.config['default']
@@ -201,6 +229,8 @@ class ProjectConfig(object):
         self.cleanup_config()
 
         self.setup_image()
+        self.setup_ccache()
+        self.setup_apt_cache()
         self.setup_libs()
         self.handle_path_keys_and_placeholders()
 
@@ -273,13 +303,26 @@ class ProjectConfig(object):
                 self.config['make_jobs'] = make_jobs_args
         else:
             if not self.config['make_jobs']:
-                self.config['make_jobs'] = multiprocessing.cpu_count()
+                self.config['make_jobs'] = get_job_budget(self.parallel_builds)
 
             self.config['make_args'] = merge_make_jobs_into_args(
                     self.config['make_args'], self.config['make_jobs'])
 
         self.config['make_jobs'] = str(self.config['make_jobs'])
 
+        try:
+            self.config['lib_jobs'] = int(self.config['lib_jobs'])
+        except ValueError:
+            raise ClickableException('"lib_jobs" must be a number')
+
+        if self.config['lib_jobs'] < 1:
+            raise ClickableException('"lib_jobs" must be at least 1')
+
+        try:
+            self.config['apt_update_max_age'] = int(self.config['apt_update_max_age'])
+        except ValueError:
+            raise ClickableException('"apt_update_max_age" must be a number of seconds')
+
         if not self.config['framework']:
             qt = self.config['qt_version']
             framework = Constants.default_qt_framework_mapping.get(qt, None)
@@ -360,7 +403,11 @@ class ProjectConfig(object):
                         raise ClickableException('"{}" is a no longer a valid configuration option'.format(key))
 
                 schema = self.load_json_schema()
-                validate_clickable_json(config=config_json, schema=schema)
+                digest = self.get_config_digest(config_json, schema)
+                if self.is_config_validated(config_path, digest):
+                    logger.debug('Skipping validation of unchanged {}'.format(config_path))
+                elif validate_clickable_json(config=config_json, schema=schema):
+                    self.remember_validated_config(config_path, digest)
 
                 for key in self.config:
                     value = config_json.get(key, None)
@@ -372,6 +419,44 @@ class ProjectConfig(object):
 
         return config
 
+    def get_config_digest(self, config_json, schema):
+        return hashlib.sha256(json.dumps({
+            'config': config_json,
+            'schema': schema,
+            'clickable_version': self.clickable_version,
+        }, sort_keys=True).encode()).hexdigest()
+
+    def load_config_validation_cache(self):
+        if not os.path.isfile(config_validation_cache):
+            return {}
+
+        with open(config_validation_cache, 'r') as f:
+            try:
+                return json.load(f)
+            except ValueError:
+                return {}
+
+    def is_config_validated(self, config_path, digest):
+        '''
+        Validating against the schema is the slowest part of loading the
+        config, so configs that passed it are remembered by their digest.
+        '''
+
+        return self.load_config_validation_cache().get(os.path.abspath(config_path), None) == digest
+
+    def remember_validated_config(self, config_path, digest):
+        cache = self.load_config_validation_cache()
+        cache[os.path.abspath(config_path)] = digest
+
+        try:
+            os.makedirs(os.path.dirname(config_validation_cache), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(config_validation_cache, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, config_validation_cache)
+        except OSError as e:
+            logger.debug('Failed to write the config validation cache', exc_info=e)
+
     def load_env_config(self):
         if self.get_env_var('OPENSTORE_API_KEY'):
             self.apikey = self.get_env_var('OPENSTORE_API_KEY')
@@ -403,6 +488,27 @@ class ProjectConfig(object):
         if self.get_env_var('CLICKABLE_NON_INTERACTIVE'):
             self.interactive = False
 
+        if self.get_env_var('CLICKABLE_PERSISTENT_CONTAINER'):
+            self.persistent_container = True
+
+        if self.get_env_var('CLICKABLE_CLICK_CACHE'):
+            self.click_cache = True
+
+        if self.get_env_var('CLICKABLE_CLICK_CACHE_SIZE'):
+            try:
+                self.click_cache_size = int(self.get_env_var('CLICKABLE_CLICK_CACHE_SIZE'))
+            except ValueError:
+                raise ClickableException('CLICKABLE_CLICK_CACHE_SIZE must be a number of megabytes')
+
+        if self.get_env_var('CLICKABLE_REPRODUCIBLE'):
+            self.reproducible = True
+
+        if self.get_env_var('SOURCE_DATE_EPOCH'):
+            try:
+                self.source_date_epoch = int(self.get_env_var('SOURCE_DATE_EPOCH'))
+            except ValueError:
+                raise ClickableException('SOURCE_DATE_EPOCH must be a unix timestamp')
+
         config = {}
         for var, name in self.ENV_MAP.items():
             if self.get_env_var(var):
@@ -473,6 +579,18 @@ class ProjectConfig(object):
         if args.skip_review:
             self.skip_review = True
 
+        if args.persistent_container:
+            self.persistent_container = True
+
+        if args.click_cache:
+            self.click_cache = True
+
+        if args.force:
+            self.force_build = True
+
+        if args.reproducible:
+            self.reproducible = True
+
         if args.lang:
             self.desktop_locale = args.lang
 
@@ -486,6 +604,15 @@ class ProjectConfig(object):
         if args.dirty:
             config['dirty'] = True
 
+        if args.incremental:
+            config['incremental'] = True
+
+        if args.ccache:
+            config['ccache'] = True
+
+        if args.apt_cache:
+            config['apt_cache'] = True
+
         if args.skip_build:
             self.desktop_skip_build = True
 
@@ -505,6 +632,12 @@ class ProjectConfig(object):
     def set_env_vars(self):
         os.environ.update(self.get_env_vars())
 
+    def get_process_env(self):
+        # Passed to host processes explicitly, os.environ is shared by parallel builds
+        env = os.environ.copy()
+        env.update(self.get_env_vars())
+        return env
+
     def get_env_vars(self):
         env_vars = {}
 
@@ -514,6 +647,12 @@ class ProjectConfig(object):
         if self.debug_build:
             env_vars['DEBUG_BUILD'] = '1'
 
+        env_vars['CARGO_BUILD_JOBS'] = self.config['make_jobs']
+        env_vars['GOMAXPROCS'] = self.config['make_jobs']
+
+        if self.ccache_dir:
+            env_vars['CCACHE_DIR'] = self.get_ccache_env_dir()
+
         if self.lib_configs:
             install_dirs = [lib.install_dir for lib in self.lib_configs]
             env_vars['CMAKE_PREFIX_PATH'] = ':'.join(install_dirs)
@@ -525,29 +664,17 @@ class ProjectConfig(object):
 
         return env_vars
 
-    def substitute(self, sub, rep, key):
-        if self.config[key]:
-            if isinstance(self.config[key], dict):
-                self.config[key] = {k: val.replace(sub, rep) for (k, val) in self.config[key].items()}
-            elif isinstance(self.config[key], list):
-                self.config[key] = [val.replace(sub, rep) for val in self.config[key]]
-            else:
-                self.config[key] = self.config[key].replace(sub, rep)
-
     def handle_path_keys_and_placeholders(self):
         for key in self.path_keys:
             if key not in self.accepts_placeholders and self.config[key]:
                 self.config[key] = make_absolute(self.config[key])
 
-        for key in self.accepts_placeholders:
-            for sub in self.placeholders:
-                rep = self.config[self.placeholders[sub]]
-                self.substitute("${"+sub+"}", rep, key)
-                # TODO remove deprecated syntax $VAR
-                self.substitute("$"+sub, rep, key)
+        def make_path_absolute(key):
             if key in self.path_keys and self.config[key]:
                 self.config[key] = make_absolute(self.config[key])
 
+        Placeholders(self.placeholders).resolve(self.config, self.accepts_placeholders, make_path_absolute)
+
     def set_host_arch(self):
         host = platform.machine()
         self.host_arch = Constants.host_arch_mapping.get(host, None)
@@ -575,6 +702,10 @@ class ProjectConfig(object):
             self.use_nvidia = False
 
     def setup_libs(self):
+        # Libs built in parallel share the job budget of this build
+        parallel_builds = self.parallel_builds * max(1, min(
+                self.config['lib_jobs'], len(self.config['libraries'])))
+
         self.lib_configs = [
             LibConfig(
                 name,
@@ -584,9 +715,20 @@ class ProjectConfig(object):
                 self.config['qt_version'],
                 self.debug_build,
                 self.verbose,
+                parallel_builds,
             ) for name, lib in self.config['libraries'].items()
         ]
 
+        for lib in self.lib_configs:
+            lib.apt_cache_dir = self.apt_cache_dir
+            lib.apt_update_max_age = self.config['apt_update_max_age']
+
+            if self.ccache_dir:
+                lib.ccache_dir = self.ccache_dir
+                lib.add_ccache_dependency()
+
+        self.check_lib_dependencies()
+
         for lib in self.lib_configs:
             name_conform = make_env_var_conform(lib.name)
             key = '{}_lib_install_dir'.format(name_conform)
@@ -604,6 +746,64 @@ class ProjectConfig(object):
                 placeholder_old = '{}_LIB_{}'.format(lib.name, make_env_var_conform(lp))
                 self.placeholders[placeholder_old] = key
 
+    def get_image_framework(self):
+        return Constants.framework_image_mapping.get(
+                self.config['framework'], Constants.framework_fallback)
+
+    def setup_ccache(self):
+        if not self.config['ccache']:
+            return
+
+        # Object files can only be shared between builds for the same arch and image
+        self.ccache_dir = os.path.expanduser('~/.clickable/ccache/{}-{}'.format(
+            self.config['arch'], self.get_image_framework()))
+
+        self.add_ccache_dependency()
+
+    def setup_apt_cache(self):
+        # In container mode packages are installed directly, without an image build
+        if not self.config['apt_cache'] or self.container_mode:
+            return
+
+        # Shared by all images of an arch and framework, builds using it are
+        # serialized with a file lock (see Container.build_image_with_apt_cache)
+        self.apt_cache_dir = os.path.expanduser('~/.clickable/apt/{}-{}'.format(
+            self.config['arch'], self.get_image_framework()))
+
+    def add_ccache_dependency(self):
+        if 'ccache' not in self.config['dependencies_host']:
+            self.config['dependencies_host'].append('ccache')
+
+    def get_ccache_env_dir(self):
+        return self.ccache_dir if self.container_mode else '/ccache'
+
+    def check_lib_dependencies(self):
+        libs = {lib.name: lib for lib in self.lib_configs}
+
+        for lib in self.lib_configs:
+            for dependency in lib.depends_on:
+                if dependency not in libs:
+                    raise ClickableException('Library "{}" depends on the unknown library "{}"'.format(lib.name, dependency))
+
+        # Depth first search for cycles, libs on the stack are still being visited
+        visited = set()
+
+        def visit(name, stack):
+            if name in stack:
+                cycle = stack[stack.index(name):] + [name]
+                raise ClickableException('Libraries have a circular dependency: {}'.format(' -> '.join(cycle)))
+
+            if name in visited:
+                return
+
+            for dependency in libs[name].depends_on:
+                visit(dependency, stack + [name])
+
+            visited.add(name)
+
+        for name in libs:
+            visit(name, [])
+
     def cleanup_config(self):
         for key in self.flexible_lists:
             self.config[key] = flexible_string_to_list(self.config[key])
@@ -613,7 +813,7 @@ class ProjectConfig(object):
         if self.desktop_locale != "C" and "." not in self.desktop_locale:
             self.desktop_locale = "{}.UTF-8".format(self.desktop_locale)
 
-        if self.config['dirty'] and 'clean' in self.config['default']:
+        if (self.config['dirty'] or self.config['incremental']) and 'clean' in self.config['default']:
             self.config['default'].remove('clean')
         self.config['default'] = ' '.join(self.config['default'])
 
@@ -639,10 +839,18 @@ class ProjectConfig(object):
     def needs_builder(self):
         return self.is_build_cmd()
 
+    def is_container_free_build(self):
+        return (self.config['builder'] in Constants.container_free_builders and
+                self.skip_review and
+                not self.config['ccache'] and
+                not self.is_desktop_mode() and
+                'build-libs' not in self.commands and
+                not any(self.config[key] for key in ['install_lib', 'install_bin', 'install_qml', 'install_data']))
+
     def needs_clickable_image(self):
         return (not self.is_custom_docker_image and
                 not self.container_mode and
-                (self.is_build_cmd() or
+                ((self.is_build_cmd() and not self.is_container_free_build()) or
                     bool(set(['setup', 'run', 'ide', 'update', 'gdb', 'gdbserver', 'review']).intersection(self.commands))))
 
     def needs_docker(self):
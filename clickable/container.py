@@ -1,27 +1,74 @@
 import subprocess
+import fcntl
 import time
 import shlex
 import os
 import shutil
 import getpass
-import uuid
+import hashlib
 import sys
 import json
+import atexit
+import tarfile
+import threading
+from contextlib import contextmanager
 
 from clickable.utils import (
     run_subprocess_call,
     run_subprocess_check_call,
     run_subprocess_check_output,
+    run_subprocess_prefixed,
     check_command,
     image_exists,
+    get_image_id,
+    get_image_history,
+    get_image_label,
+    get_image_config,
 )
-from clickable.logger import logger
+from clickable.docker_api import get_docker_socket
+from clickable.derived_images import get_derived_images
+from clickable.system.resources import get_available_cpus
+from clickable.system.queries.packages_installed import PackagesInstalled, DPKG_STATUS
+from clickable.logger import logger, get_log_prefix
 from clickable.config.project import ProjectConfig
 from clickable.config.constants import Constants
 from clickable.exceptions import ClickableException
 
 
+DOCKER_CHECK_TTL = 60 * 60  # seconds
+docker_check_stamp = os.path.expanduser('~/.clickable/docker_check.json')
+apt_update_stamp = os.path.expanduser('~/.clickable/apt_update_stamp')
+dpkg_check_stamp = os.path.expanduser('~/.clickable/dpkg_check.json')
+APT_CACHE_MOUNT = '/apt-cache'
+
+
+@contextmanager
+def lock_apt_cache(apt_cache_dir):
+    '''
+    Builds of different images share the apt cache, so they must not run
+    apt or copy the package lists at the same time, neither from other
+    threads nor from other clickable processes.
+    '''
+
+    os.makedirs(apt_cache_dir, exist_ok=True)
+    with open(os.path.join(apt_cache_dir, '.lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
 class Container(object):
+    # Long-lived containers shared by all Container instances of this process,
+    # keyed by (image, build arch, mounts, network)
+    sessions = {}
+    sessions_lock = threading.Lock()
+    # Parallel lib builds must not build the same image twice
+    image_locks = {}
+    # Docker only needs to be checked once per process
+    docker_checked = False
+
     def __init__(self, config, name=None, minimum_version=None):
         self.config = config
         self.docker_mode = self.config.needs_docker()
@@ -68,13 +115,10 @@ class Container(object):
 
             self.check_docker()
 
-            command_base = 'docker images -q {}'.format(self.base_docker_image)
-            command_cached = 'docker history -q {}'.format(cached_image)
+            hash_base = get_image_id(self.base_docker_image)
+            history_cached = get_image_history(cached_image)
 
-            hash_base = run_subprocess_check_output(command_base).strip()
-            history_cached = run_subprocess_check_output(command_cached).strip()
-
-            if hash_base in history_cached:
+            if hash_base and hash_base in history_cached:
                 logger.debug("Found cached container")
                 self.docker_image = cached_image
             else:
@@ -92,10 +136,63 @@ class Container(object):
 
         return started
 
+    def get_docker_check_fingerprint(self):
+        socket = get_docker_socket()
+        if not socket:
+            return None
+
+        try:
+            return {
+                'user': getpass.getuser(),
+                'socket_inode': os.stat(socket).st_ino,
+                'group_mtime': os.stat('/etc/group').st_mtime,
+            }
+        except OSError:
+            return None
+
+    def is_docker_check_cached(self):
+        fingerprint = self.get_docker_check_fingerprint()
+        if not fingerprint or not os.path.isfile(docker_check_stamp):
+            return False
+
+        with open(docker_check_stamp, 'r') as f:
+            try:
+                stamp = json.load(f)
+            except ValueError:
+                return False
+
+        return (
+            stamp.get('fingerprint', None) == fingerprint and
+            time.time() - stamp.get('time', 0) < DOCKER_CHECK_TTL
+        )
+
+    def write_docker_check_stamp(self):
+        fingerprint = self.get_docker_check_fingerprint()
+        if not fingerprint:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(docker_check_stamp), exist_ok=True)
+            with open(docker_check_stamp, 'w') as f:
+                json.dump({
+                    'fingerprint': fingerprint,
+                    'time': time.time(),
+                }, f)
+        except OSError as e:
+            logger.debug('Failed to write docker check stamp', exc_info=e)
+
     def check_docker(self, retries=3):
         if not self.docker_mode:
             raise ClickableException("Container was not initialized with Container Mode. This seems to be a bug in Clickable.")
 
+        if Container.docker_checked:
+            return
+
+        if self.is_docker_check_cached():
+            logger.debug('Using cached docker check')
+            Container.docker_checked = True
+            return
+
         if self.needs_docker_setup():
             self.setup_docker()
 
@@ -110,6 +207,10 @@ class Container(object):
 
             time.sleep(3)  # Give it a sec to boot up
             self.check_docker(retries)
+            return
+
+        Container.docker_checked = True
+        self.write_docker_check_stamp()
 
     def docker_group_exists(self):
         group_exists = False
@@ -164,21 +265,41 @@ class Container(object):
                     if os.path.exists(dst_path):
                         os.remove(dst_path)
                     shutil.copy(f, dst_parent, follow_symlinks=False)
-        else:  # Docker
-            mounts = self.render_mounts(
-                self.get_docker_mounts(transparent=[self.config.root_dir]))
-            command_create = 'docker create {} {}'.format(
-                mounts, self.docker_image)
-            container = run_subprocess_check_output(command_create).strip()
+        elif files:  # Docker
+            self.check_docker()
 
+            # Stream all files in one archive out of a helper container, which
+            # is shared by all subsequent pulls
+            mounts = self.get_docker_mounts(transparent=[self.config.root_dir])
+            members = []
             for f in files:
-                command_copy = 'docker cp {}:{} {}'.format(
-                    container, f, dst_parent)
-                run_subprocess_check_call(command_copy)
+                members.extend([
+                    '-C', shlex.quote(os.path.dirname(f) or '.'),
+                    shlex.quote(os.path.basename(f)),
+                ])
+
+            command = 'docker exec -w {cwd} -i {container} tar c {members}'.format(
+                cwd=self.config.build_dir,
+                container=self.get_session(mounts),
+                members=' '.join(members),
+            )
+            logger.debug('Pulling files via: {}'.format(command))
 
-            command_remove = 'docker rm {}'.format(container)
-            run_subprocess_check_call(command_remove,
-                                      stdout=subprocess.DEVNULL)
+            process = subprocess.Popen(shlex.split(command), stdout=subprocess.PIPE)
+            try:
+                with tarfile.open(fileobj=process.stdout, mode='r|') as tar:
+                    # Keep members from escaping dst_parent where extraction filters are available
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extractall(dst_parent, filter='tar')
+                    else:
+                        tar.extractall(dst_parent)
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+
+            if returncode != 0:
+                raise ClickableException('Failed to pull {} from the container (exit code {})'.format(
+                    ', '.join(files), returncode))
 
     def get_docker_mounts(self, transparent=[]):
         # container path is key, host path is value
@@ -206,6 +327,10 @@ class Container(object):
             mounts['/opt/rust/cargo/git'] = cargo_git
             mounts['/opt/rust/cargo/.package-cache'] = cargo_package_cache_lock
 
+        if self.config.ccache_dir:
+            os.makedirs(self.config.ccache_dir, exist_ok=True)
+            mounts['/ccache'] = self.config.ccache_dir
+
         for path in transparent:
             mounts[path] = path
 
@@ -217,6 +342,60 @@ class Container(object):
             for container, host in mounts.items()
         ])
 
+    def get_cpus_option(self):
+        '''
+        Limits the container to the job budget when several builds run in
+        parallel, so that they don't oversubscribe the CPUs.
+        '''
+
+        if self.config.parallel_builds <= 1:
+            return ''
+
+        return '--cpus {}'.format(min(int(self.config.make_jobs), get_available_cpus()))
+
+    def get_session(self, mounts, localhost=False):
+        key = (
+            self.docker_image,
+            self.config.build_arch,
+            tuple(sorted(mounts.items())),
+            localhost,
+            self.get_cpus_option(),
+        )
+
+        with Container.sessions_lock:
+            if key not in Container.sessions:
+                if not Container.sessions:
+                    atexit.register(Container.stop_sessions)
+
+                command = 'docker run -d --rm {mounts} {cpus} {network} {image} sleep infinity'.format(
+                    mounts=self.render_mounts(mounts),
+                    cpus=self.get_cpus_option(),
+                    network='--network="host"' if localhost else "",
+                    image=self.docker_image,
+                )
+                Container.sessions[key] = run_subprocess_check_output(command).strip()
+                logger.debug('Started persistent container {}'.format(Container.sessions[key]))
+
+            return Container.sessions[key]
+
+    @staticmethod
+    def stop_sessions(build_arch=None):
+        '''
+        Removes the persistent containers, only those of the given build arch
+        if specified.
+        '''
+
+        with Container.sessions_lock:
+            keys = [key for key in Container.sessions if build_arch is None or key[1] == build_arch]
+            containers = [Container.sessions.pop(key) for key in keys]
+
+        if not containers:
+            return
+
+        logger.debug('Stopping persistent containers {}'.format(', '.join(containers)))
+        run_subprocess_call('docker rm -f {}'.format(' '.join(containers)),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
     def run_command(self,
                     command,
                     root_user=False,
@@ -261,39 +440,57 @@ class Container(object):
             if not root_user:
                 user = "-u {}".format(os.getuid())
 
-            mounts = self.render_mounts(
-                self.get_docker_mounts(transparent=[cwd]))
-
-            wrapped_command = 'docker run {mounts} {env} {go} {rust} {user} -w {cwd} --rm {tty} {network} -i {image} bash -c "{cmd}"'.format(
-                mounts=mounts,
-                env=env_vars,
-                go=go_config,
-                rust=rust_config,
-                cwd=self.config.build_dir if use_build_dir else cwd,
-                user=user,
-                image=self.docker_image,
-                cmd=command,
-                tty="-t" if tty else "",
-                network='--network="host"' if localhost else "",
-            )
+            mounts = self.get_docker_mounts(transparent=[cwd])
+
+            if self.config.persistent_container:
+                wrapped_command = 'docker exec {env} {go} {rust} {user} -w {cwd} {tty} -i {container} bash -c "{cmd}"'.format(
+                    env=env_vars,
+                    go=go_config,
+                    rust=rust_config,
+                    cwd=self.config.build_dir if use_build_dir else cwd,
+                    user=user,
+                    container=self.get_session(mounts, localhost),
+                    cmd=command,
+                    tty="-t" if tty else "",
+                )
+            else:
+                wrapped_command = 'docker run {mounts} {env} {go} {rust} {user} {cpus} -w {cwd} --rm {tty} {network} -i {image} bash -c "{cmd}"'.format(
+                    mounts=self.render_mounts(mounts),
+                    cpus=self.get_cpus_option(),
+                    env=env_vars,
+                    go=go_config,
+                    rust=rust_config,
+                    cwd=self.config.build_dir if use_build_dir else cwd,
+                    user=user,
+                    image=self.docker_image,
+                    cmd=command,
+                    tty="-t" if tty else "",
+                    network='--network="host"' if localhost else "",
+                )
 
         kwargs = {}
         if use_build_dir:
             kwargs['cwd'] = self.config.build_dir
 
+        if self.config.container_mode:
+            # Libs may be built in parallel, so don't rely on os.environ
+            kwargs['env'] = self.config.get_process_env()
+
         if get_output:
             return run_subprocess_check_output(shlex.split(wrapped_command), **kwargs)
+        elif get_log_prefix():
+            run_subprocess_prefixed(shlex.split(wrapped_command), get_log_prefix(), **kwargs)
         else:
             subprocess.check_call(shlex.split(wrapped_command), **kwargs)
 
+    def get_target_dependency_packages(self):
+        return [
+            dep if ':' in dep else '{}:{}'.format(dep, self.config.arch)
+            for dep in self.config.dependencies_target
+        ]
+
     def get_dependency_packages(self):
-        dependencies = self.config.dependencies_host
-        for dep in self.config.dependencies_target:
-            if ':' in dep:
-                dependencies.append(dep)
-            else:
-                dependencies.append('{}:{}'.format(dep, self.config.arch))
-        return dependencies
+        return list(self.config.dependencies_host) + self.get_target_dependency_packages()
 
     def get_ppa_adding_commands(self):
         if self.config.dependencies_ppa:
@@ -323,20 +520,43 @@ FROM {}
             '\n'.join(run_strings)
         ).strip()
 
-    def create_custom_container(self, dockerfile_content):
+    def get_base_image_id(self):
+        base_image_id = get_image_id(self.base_docker_image)
+        if not base_image_id:
+            run_subprocess_check_call('docker pull {}'.format(self.base_docker_image))
+            base_image_id = get_image_id(self.base_docker_image)
+
+        return base_image_id
+
+    def get_derived_image_name(self, dockerfile_content, base_image_id):
+        '''
+        Images are tagged by their content, so that projects and libraries
+        with the same setup share one image.
+        '''
+
+        digest = hashlib.sha256(json.dumps({
+            'dockerfile': dockerfile_content,
+            'base_image_id': base_image_id,
+        }, sort_keys=True).encode()).hexdigest()
+
+        return '{}-{}'.format(self.base_docker_image, digest[:16])
+
+    def write_image_files(self, dockerfile_content):
         if not os.path.exists(self.clickable_dir):
             os.makedirs(self.clickable_dir)
 
         with open(self.docker_file, 'w') as f:
             f.write(dockerfile_content)
 
-        self.docker_image = '{}-{}'.format(self.base_docker_image, uuid.uuid4())
         with open(self.docker_name_file, 'w') as f:
             json.dump({
                 'name': self.docker_image,
                 'base_image': self.base_docker_image,
             },f)
 
+    def create_custom_container(self, dockerfile_content):
+        self.write_image_files(dockerfile_content)
+
         logger.debug('Generating new docker image')
         try:
             subprocess.check_call(shlex.split('docker build -t {} .'.format(self.docker_image)), cwd=self.clickable_dir)
@@ -344,27 +564,77 @@ FROM {}
             self.clean_clickable()
             raise
 
-    def is_dockerfile_outdated(self, dockerfile_content):
-        if self.docker_image == self.base_docker_image:
-            return True
-
-        if not os.path.exists(self.clickable_dir):
-            return True
-
-        if not os.path.exists(self.docker_file):
-            return True
-
-        with open(self.docker_file, 'r') as f:
-            if dockerfile_content.strip() != f.read().strip():
-                return True
-
-        command = 'docker images -q {}'.format(self.docker_image)
-        image_exists = run_subprocess_check_output(command).strip()
-        return not image_exists
+    def build_image_with_apt_cache(self, commands, env_vars, base_image_id):
+        '''
+        docker build cannot mount host directories, so every command runs in
+        a container with the apt cache mounted and is committed as a layer of
+        its own. Layers are tagged by content, just like the image itself.
+        '''
+
+        image = self.base_docker_image
+        derived_images = get_derived_images()
+        # The commands are passed as argv, so that they reach bash unchanged like RUN lines do
+        mounts = ['-v', '{}:{}:Z'.format(self.config.apt_cache_dir, APT_CACHE_MOUNT)]
+
+        # docker commit would keep "bash -c ..." as CMD, restore the base image's
+        base_config = get_image_config(self.base_docker_image) or {}
+        changes = []
+        for (instruction, key) in [('CMD', 'Cmd'), ('ENTRYPOINT', 'Entrypoint')]:
+            changes.extend(['--change', '{} {}'.format(instruction, json.dumps(base_config.get(key, None) or []))])
+
+        # The container runs as root, hand the cache back to the user afterwards
+        chown = 'chown -R {}:{} {}'.format(os.getuid(), os.getgid(), APT_CACHE_MOUNT)
+
+        # ENV lines are applied by docker build, which needs no downloads
+        if env_vars:
+            dockerfile_content = self.construct_dockerfile_content([], env_vars)
+            image = self.get_derived_image_name(dockerfile_content, base_image_id)
+            if not image_exists(image):
+                subprocess.run(shlex.split('docker build -t {} -'.format(image)),
+                        input=dockerfile_content.encode(), check=True)
+            derived_images.touch(image, self.base_docker_image)
+
+        for index, command in enumerate(commands):
+            layer = self.get_derived_image_name(
+                    self.construct_dockerfile_content(commands[:index + 1], env_vars), base_image_id)
+
+            with lock_apt_cache(self.config.apt_cache_dir):
+                if not image_exists(layer):
+                    script = '{}\nstatus=$?\n{}\nexit $status'.format(command, chown)
+                    container = run_subprocess_check_output(
+                        ['docker', 'create'] + mounts + [image, 'bash', '-c', script]).strip()
+
+                    try:
+                        run_subprocess_check_call('docker start -a {}'.format(container))
+                        run_subprocess_check_call(['docker', 'commit'] + changes + [container, layer])
+                    finally:
+                        run_subprocess_call('docker rm -f {}'.format(container),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+            derived_images.touch(layer, self.base_docker_image)
+            image = layer
+
+    def get_apt_update_cmd(self):
+        if not self.config.apt_cache_dir:
+            return 'apt-get update'
+
+        # The lists stay in the image, but are restored from the cache first,
+        # so that apt only downloads what changed. Images with other apt
+        # sources (e.g. PPAs) get lists of their own.
+        return ('sources=$(cat /etc/apt/sources.list /etc/apt/sources.list.d/* 2>/dev/null | sha256sum | cut -c1-16) && '
+                'mkdir -p {cache}/lists/$sources {cache}/archives/partial && '
+                'cp -a {cache}/lists/$sources/. /var/lib/apt/lists/ && '
+                'apt-get update && '
+                'cp -a /var/lib/apt/lists/. {cache}/lists/$sources/').format(cache=APT_CACHE_MOUNT)
 
     def get_apt_install_cmd(self, dependencies):
-        return 'apt-get install -y --force-yes --no-install-recommends {}'.format(
-                ' '.join(dependencies))
+        options = ''
+        if self.config.apt_cache_dir:
+            # The image's own archives dir is still emptied by apt-get clean
+            options = '-o Dir::Cache::Archives={}/archives '.format(APT_CACHE_MOUNT)
+
+        return 'apt-get install -y --force-yes --no-install-recommends {}{}'.format(
+                options, ' '.join(dependencies))
 
     def setup_customized_image(self):
         logger.debug('Checking dependencies and container setup')
@@ -374,25 +644,58 @@ FROM {}
         commands = []
         env_vars = self.config.image_setup.get('env', {})
 
-        commands += self.get_ppa_adding_commands()
+        commands += sorted(self.get_ppa_adding_commands())
 
-        dependencies = self.get_dependency_packages()
-        if dependencies:
+        # One layer per sorted dependency set, so that images with the same
+        # host dependencies share those layers
+        dependency_sets = [
+            sorted(set(dependencies))
+            for dependencies in [self.config.dependencies_host, self.get_target_dependency_packages()]
+            if dependencies
+        ]
+        if dependency_sets:
             commands.append(
                 'echo set debconf/frontend Noninteractive | debconf-communicate && echo set debconf/priority critical | debconf-communicate')
-            commands.append(
-                'apt-get update && {} && apt-get clean'.format(
-                    self.get_apt_install_cmd(dependencies)))
+
+            # Each layer updates the lists itself, as cached layers may be old
+            for dependencies in dependency_sets:
+                commands.append(
+                    '{} && {} && apt-get clean'.format(
+                        self.get_apt_update_cmd(),
+                        self.get_apt_install_cmd(dependencies)))
 
         if self.config.image_setup:
             commands.extend(self.config.image_setup.get('run', []))
 
         dockerfile_content = self.construct_dockerfile_content(commands, env_vars)
+        base_image_id = self.get_base_image_id()
+        self.docker_image = self.get_derived_image_name(dockerfile_content, base_image_id)
+
+        with Container.get_image_lock(self.docker_image):
+            derived_images = get_derived_images()
+            if image_exists(self.docker_image):
+                logger.debug('Image already setup')
+                self.write_image_files(dockerfile_content)
+                derived_images.touch(self.docker_image, self.base_docker_image)
+                return
 
-        if self.is_dockerfile_outdated(dockerfile_content):
-            self.create_custom_container(dockerfile_content)
-        else:
-            logger.debug('Image already setup')
+            if self.config.apt_cache_dir:
+                self.write_image_files(dockerfile_content)
+                try:
+                    self.build_image_with_apt_cache(commands, env_vars, base_image_id)
+                except subprocess.CalledProcessError:
+                    self.clean_clickable()
+                    raise
+            else:
+                self.create_custom_container(dockerfile_content)
+
+            derived_images.touch(self.docker_image, self.base_docker_image)
+            derived_images.collect_garbage(keep=[self.docker_image])
+
+    @staticmethod
+    def get_image_lock(image):
+        with Container.sessions_lock:
+            return Container.image_locks.setdefault(image, threading.Lock())
 
     def setup_container_mode(self):
         ppa_commands = self.get_ppa_adding_commands()
@@ -401,21 +704,15 @@ FROM {}
 
         dependencies = self.get_dependency_packages()
         if dependencies:
-            self.run_command('apt-get update', use_build_dir=False)
-
-            run = False
-            for dep in dependencies:
-                exists = ''
-                try:
-                    exists = self.run_command('dpkg -s {} | grep Status'.format(dep), get_output=True, use_build_dir=False)
-                except subprocess.CalledProcessError:
-                    exists = ''
-
-                if exists.strip() != 'Status: install ok installed':
-                    run = True
-                    break
+            run = not self.are_dependencies_installed(dependencies)
 
             if run:
+                if ppa_commands or not self.are_apt_lists_fresh():
+                    self.run_command('apt-get update', use_build_dir=False)
+                    self.write_apt_update_stamp()
+                else:
+                    logger.debug('Package lists are up to date, skipping apt-get update')
+
                 self.run_command(self.get_apt_install_cmd(dependencies),
                         use_build_dir=False)
             else:
@@ -425,6 +722,58 @@ FROM {}
             for command in self.config.image_setup.get('run', []):
                 self.run_command(command, use_build_dir=False)
 
+    def are_dependencies_installed(self, dependencies):
+        '''
+        Checks all dependencies at once against the dpkg status file. A
+        positive result is remembered until the status file changes.
+        '''
+
+        try:
+            status_mtime = os.stat(DPKG_STATUS).st_mtime_ns
+        except OSError:
+            status_mtime = None
+
+        stamp = {}
+        if status_mtime and os.path.isfile(dpkg_check_stamp):
+            with open(dpkg_check_stamp, 'r') as f:
+                try:
+                    stamp = json.load(f)
+                except ValueError:
+                    pass
+
+        if stamp.get('status_mtime', None) == status_mtime and set(dependencies) <= set(stamp.get('packages', [])):
+            return True
+
+        query = PackagesInstalled(dependencies)
+        missing = query.get_missing_packages()
+        if missing:
+            logger.debug('Missing dependencies: {}'.format(', '.join(missing)))
+            return False
+
+        try:
+            os.makedirs(os.path.dirname(dpkg_check_stamp), exist_ok=True)
+            with open(dpkg_check_stamp, 'w') as f:
+                json.dump({
+                    'status_mtime': status_mtime,
+                    'packages': sorted(set(dependencies) | set(stamp.get('packages', []))),
+                }, f)
+        except OSError as e:
+            logger.debug('Failed to write dpkg check stamp', exc_info=e)
+
+        return True
+
+    def are_apt_lists_fresh(self):
+        max_age = self.config.apt_update_max_age
+        if not max_age or not os.path.isfile(apt_update_stamp):
+            return False
+
+        return time.time() - os.path.getmtime(apt_update_stamp) < max_age
+
+    def write_apt_update_stamp(self):
+        os.makedirs(os.path.dirname(apt_update_stamp), exist_ok=True)
+        with open(apt_update_stamp, 'w'):
+            pass
+
     def needs_customized_container(self):
         return self.config.dependencies_host \
             or self.config.dependencies_target \
@@ -440,14 +789,9 @@ FROM {}
 
         version = 0
         try:
-            format_string = '{{ index .Config.Labels "image_version"}}'
-            command = "docker inspect --format '{}' {}".format(format_string,
-                    self.docker_image)
-            logger.debug('Checking docker image version via: {}'.format(command))
-
-            version_string = run_subprocess_check_output(command)
+            version_string = get_image_label(self.docker_image, 'image_version')
             version = int(version_string)
-        except (ValueError, subprocess.CalledProcessError):
+        except (ValueError, TypeError, subprocess.CalledProcessError):
             logger.warn("Could not read the image version from the container")
 
         if version < self.minimum_version:
@@ -455,6 +799,9 @@ FROM {}
 
 
     def setup(self):
+        if self.config.ccache_dir:
+            os.makedirs(self.config.ccache_dir, exist_ok=True)
+
         if self.config.container_mode:
             self.setup_container_mode()
 
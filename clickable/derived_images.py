@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+from clickable.logger import logger
+from clickable.utils import image_exists, remove_image
+
+
+# Derived images not used by any build within this time are removed
+DERIVED_IMAGE_TTL = 30 * 24 * 60 * 60  # seconds
+
+
+class DerivedImages(object):
+    '''
+    Keeps track of the customized images built on top of the clickable
+    images and when they were last used, so that images no project uses
+    anymore can be removed.
+    '''
+
+    lock = threading.Lock()
+
+    def __init__(self, path, ttl=DERIVED_IMAGE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            logger.warning('Derived image registry is invalid, starting a new one')
+            return {}
+
+    def save(self, images):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(images, f, indent=4, sort_keys=True)
+
+        os.replace(tmp_path, self.path)
+
+    def touch(self, image, base_image):
+        with DerivedImages.lock:
+            images = self.load()
+            images[image] = {
+                'base_image': base_image,
+                'last_used': time.time(),
+            }
+            self.save(images)
+
+    def collect_garbage(self, keep=[]):
+        with DerivedImages.lock:
+            images = self.load()
+            now = time.time()
+
+            for image, info in list(images.items()):
+                if image in keep or now - info.get('last_used', 0) < self.ttl:
+                    continue
+
+                if image_exists(image):
+                    logger.debug('Removing unused docker image {}'.format(image))
+                    if not remove_image(image):
+                        # Probably still used by a container, try again later
+                        continue
+
+                del images[image]
+
+            self.save(images)
+
+
+def get_derived_images():
+    return DerivedImages(os.path.expanduser('~/.clickable/derived_images.json'))
@@ -0,0 +1,156 @@
+import http.client
+import json
+import os
+import socket
+import threading
+import urllib.parse
+
+from clickable.logger import logger
+from clickable.exceptions import ClickableException
+
+
+class DockerApiException(ClickableException):
+    pass
+
+
+# Raised when the daemon can't be reached, callers fall back to the docker CLI then
+DOCKER_API_ERRORS = (OSError, http.client.HTTPException)
+
+
+def get_docker_socket():
+    docker_host = os.environ.get('DOCKER_HOST', None)
+    if not docker_host:
+        return '/var/run/docker.sock'
+
+    if docker_host.startswith('unix://'):
+        return docker_host[len('unix://'):]
+
+    return None
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerApi(object):
+    '''
+    Minimal client for the Docker Engine API that talks HTTP over the docker
+    unix socket. One keep-alive connection is reused for all requests, which
+    avoids forking the docker CLI for simple queries.
+    '''
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.connection = UnixHTTPConnection(socket_path)
+        self.lock = threading.Lock()
+
+    def ping(self):
+        try:
+            status, _ = self.request('GET', '/_ping')
+            return status == 200
+        except DOCKER_API_ERRORS:
+            return False
+
+    def request(self, method, path, params=None, body=None):
+        if params:
+            path = '{}?{}'.format(path, urllib.parse.urlencode(params))
+
+        headers = {}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        with self.lock:
+            response = self.send(method, path, body, headers)
+            return response.status, response.read()
+
+    def send(self, method, path, body, headers):
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            return self.connection.getresponse()
+        except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+            # The daemon closed the idle connection, open a new one
+            self.connection.close()
+            self.connection.request(method, path, body=body, headers=headers)
+            return self.connection.getresponse()
+
+    def request_json(self, method, path, params=None, body=None, not_found=None):
+        status, data = self.request(method, path, params, body)
+
+        if status == 404:
+            return not_found
+
+        if status >= 300:
+            raise DockerApiException('Docker API request {} {} failed ({}): {}'.format(
+                method, path, status, data.decode(errors='replace').strip()))
+
+        if not data:
+            return None
+
+        return json.loads(data.decode())
+
+    def image_inspect(self, image):
+        return self.request_json('GET', '/images/{}/json'.format(urllib.parse.quote(image)))
+
+    def image_pull(self, image):
+        '''
+        Pulls the image, the daemon streams progress messages and reports
+        failures as an error message in the stream as well.
+        '''
+
+        name, tag = image, 'latest'
+        if ':' in image.rsplit('/', 1)[-1]:
+            name, tag = image.rsplit(':', 1)
+
+        status, data = self.request('POST', '/images/create', {'fromImage': name, 'tag': tag})
+        if status >= 300:
+            raise DockerApiException('Failed to pull {} ({}): {}'.format(
+                image, status, data.decode(errors='replace').strip()))
+
+        for line in data.decode(errors='replace').splitlines():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+
+            if 'error' in message:
+                raise DockerApiException('Failed to pull {}: {}'.format(image, message['error']))
+
+            logger.debug('{}: {}'.format(image, message.get('status', '')))
+
+    def image_history(self, image):
+        return self.request_json('GET', '/images/{}/history'.format(urllib.parse.quote(image)), not_found=[])
+
+
+docker_api = None
+docker_api_checked = False
+
+
+def get_docker_api():
+    '''
+    Returns the shared API client or None if the docker socket can't be
+    used, in which case callers fall back to the docker CLI.
+    '''
+
+    global docker_api, docker_api_checked
+
+    if not docker_api_checked:
+        docker_api_checked = True
+
+        socket_path = get_docker_socket()
+        if socket_path and os.path.exists(socket_path):
+            api = DockerApi(socket_path)
+            if api.ping():
+                docker_api = api
+            else:
+                logger.debug('Docker socket {} is not usable, falling back to the docker cli'.format(socket_path))
+
+    return docker_api
@@ -0,0 +1,127 @@
+import os
+
+from clickable.staging import IgnoreMatcher
+
+
+class FileIndex(object):
+    '''
+    Index of the files below a directory, built with a single os.scandir
+    traversal. Hidden directories, ignored directories, entries matching the
+    ignore list and everything below the depth limit are pruned while walking. The index stays valid as long
+    as the mtimes of the indexed directories do not change.
+    '''
+
+    # Indexes shared within one invocation, keyed by root and options
+    indexes = {}
+
+    def __init__(self, root, depth=None, ignore_dir=None, include_dir=None, ignore=()):
+        self.root = root
+        self.depth = depth
+        self.ignore_dir = ignore_dir
+        # Directory searched even if it is hidden or ignored, like the build dir
+        self.include_dir = include_dir
+        # Same matching as for staging the project, see the "ignore" config
+        self.ignore = IgnoreMatcher(ignore) if ignore else None
+
+        self.dir_mtimes = {}
+        self.files = []
+
+    @staticmethod
+    def get(root, depth=None, ignore_dir=None, include_dir=None, ignore=()):
+        ignore = tuple(ignore)
+        key = (root, depth, ignore_dir, include_dir, ignore)
+
+        index = FileIndex.indexes.get(key, None)
+        if index is None:
+            index = FileIndex(root, depth, ignore_dir, include_dir, ignore)
+            FileIndex.indexes[key] = index
+
+        if not index.is_valid():
+            index.scan()
+
+        return index
+
+    def is_valid(self):
+        if not self.dir_mtimes:
+            return False
+
+        for path, mtime in self.dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+
+        return True
+
+    def scan(self):
+        self.dir_mtimes = {}
+        self.files = []
+        self.scan_dir(self.root, 0)
+
+    def scan_dir(self, path, level):
+        try:
+            self.dir_mtimes[path] = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return
+
+        # Same order as a top down os.walk: files of a directory before its subdirectories
+        dirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if self.is_ignored(entry):
+                continue
+
+            if not is_dir:
+                if self.ignore_dir is None or not path.startswith(self.ignore_dir):
+                    self.files.append((path, entry.name))
+                continue
+
+            if entry.name[0] == '.' and entry.path != self.include_dir:
+                continue
+            if self.ignore_dir is not None and entry.path.startswith(self.ignore_dir):
+                continue
+            if entry.is_symlink():
+                continue
+
+            dirs.append(entry.path)
+
+        if self.depth and level >= self.depth:
+            return
+
+        for dir in dirs:
+            self.scan_dir(dir, level + 1)
+
+    def is_ignored(self, entry):
+        if not self.ignore or not self.ignore.matches(entry.name, entry.path):
+            return False
+
+        # Never prune the way to the build dir
+        return not (self.include_dir and
+                    (entry.path == self.include_dir or self.include_dir.startswith(entry.path + os.sep)))
+
+    def find(self, queries):
+        '''
+        Answers all queries in one pass over the index. Each query is a
+        tuple of a list of names and whether only their extensions have to
+        match. Returns a list of matching paths per query.
+        '''
+
+        found = [[] for query in queries]
+        for (root, name) in self.files:
+            for idx, (names, extensions_only) in enumerate(queries):
+                if extensions_only:
+                    ok = any(name.endswith(n) for n in names)
+                else:
+                    ok = name in names
+
+                if ok:
+                    found[idx].append(os.path.join(root, name))
+
+        return found
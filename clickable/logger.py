@@ -1,5 +1,6 @@
 import logging
 import os
+import threading
 
 
 class Colors:
@@ -29,10 +30,36 @@ class ColorFormatter(logging.Formatter):
         return super().format(record)
 
 
+log_context = threading.local()
+
+
+def set_log_prefix(prefix):
+    log_context.prefix = prefix
+
+
+def get_log_prefix():
+    return getattr(log_context, 'prefix', None)
+
+
+class PrefixFilter(logging.Filter):
+    '''
+    Prefixes messages with the prefix of the current thread, which keeps
+    the output of parallel builds apart.
+    '''
+
+    def filter(self, record):
+        prefix = get_log_prefix()
+        if prefix:
+            record.msg = '[{}] {}'.format(prefix, record.msg)
+
+        return True
+
+
 # TODO log to a file
 
 logger = logging.getLogger('clickable')
 logger.setLevel(logging.DEBUG)
+logger.addFilter(PrefixFilter())
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(ColorFormatter())
@@ -0,0 +1,194 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+
+from clickable.logger import logger
+
+
+# ioctl cloning a whole file on copy-on-write filesystems (btrfs, xfs), from linux/fs.h
+FICLONE = 0x40049409
+
+
+class IgnoreMatcher(object):
+    '''
+    Precompiled ignore list. Each entry is compared against the name and
+    the absolute path of a file or directory. Plain entries are looked up
+    in a set, entries containing wildcards are combined into one regex.
+    '''
+
+    def __init__(self, patterns, extensions=[]):
+        self.names = set()
+        globs = []
+        for pattern in patterns:
+            if any(c in pattern for c in '*?['):
+                globs.append(fnmatch.translate(pattern))
+            else:
+                self.names.add(pattern)
+
+        self.glob = re.compile('|'.join(globs)) if globs else None
+        self.extensions = tuple(extensions)
+
+    def matches(self, name, path):
+        if name in self.names or path in self.names:
+            return True
+
+        if self.extensions and name.endswith(self.extensions):
+            return True
+
+        return bool(self.glob and (self.glob.match(name) or self.glob.match(path)))
+
+
+def is_same_file(src_stat, dst):
+    try:
+        dst_stat = os.stat(dst)
+    except OSError:
+        return False
+
+    return src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def clone_file(src, dst):
+    '''
+    Shares the data blocks of src with dst where the filesystem supports
+    it. Returns False if the file has to be copied instead.
+    '''
+
+    try:
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    except OSError:
+        return False
+
+    shutil.copystat(src, dst)
+    return True
+
+
+class Stager(object):
+    '''
+    Mirrors a source tree into a target directory, skipping everything the
+    ignore matcher matches. Files already staged with the same size and
+    mtime are kept, all others are cloned if possible or copied otherwise,
+    in parallel.
+
+    With a sync manifest, the staged files are recorded, so that files
+    removed from the source are removed from the target on the next sync,
+    while files created by the build itself are left alone.
+    '''
+
+    def __init__(self, src, dst, ignore, manifest_path=None, workers=None):
+        self.src = os.path.abspath(src)
+        self.dst = os.path.abspath(dst)
+        self.ignore = ignore
+        self.manifest_path = manifest_path
+        self.workers = workers
+
+        # Stays True until cloning fails once, e.g. on ext4 or across filesystems
+        self.can_clone = True
+
+    def load_manifest(self):
+        if not self.manifest_path or not os.path.isfile(self.manifest_path):
+            return []
+
+        with open(self.manifest_path, 'r') as f:
+            try:
+                manifest = json.load(f)
+            except ValueError:
+                logger.warning('Sync manifest is invalid, ignoring it')
+                return []
+
+        if manifest.get('src', None) != self.src or manifest.get('dst', None) != self.dst:
+            return []
+
+        return manifest.get('files', [])
+
+    def save_manifest(self, files):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+
+        tmp_path = '{}.{}.tmp'.format(self.manifest_path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'src': self.src,
+                'dst': self.dst,
+                'files': files,
+            }, f)
+
+        os.replace(tmp_path, self.manifest_path)
+
+    def collect(self, src_dir, dst_dir, dirs, files):
+        dirs.append(dst_dir)
+
+        with os.scandir(src_dir) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        for entry in entries:
+            if self.ignore.matches(entry.name, entry.path):
+                continue
+
+            dst = os.path.join(dst_dir, entry.name)
+            if entry.is_dir():
+                self.collect(entry.path, dst, dirs, files)
+            else:
+                files.append((entry.path, dst, entry.stat()))
+
+    def copy_file(self, src, dst, src_stat):
+        if is_same_file(src_stat, dst):
+            return False
+
+        if os.path.lexists(dst):
+            os.remove(dst)
+
+        if not (self.can_clone and clone_file(src, dst)):
+            self.can_clone = False
+            shutil.copy2(src, dst)
+
+        return True
+
+    def remove_stale_files(self, staged, previous, dirs):
+        removed = 0
+        for rel_path in set(previous) - set(staged):
+            path = os.path.join(self.dst, rel_path)
+            if os.path.isfile(path) or os.path.islink(path):
+                os.remove(path)
+                removed += 1
+
+            # Remove directories which became empty and are gone from the source
+            parent = os.path.dirname(path)
+            while parent != self.dst and parent not in dirs and os.path.isdir(parent) and not os.listdir(parent):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+
+        return removed
+
+    def stage(self):
+        previous = self.load_manifest()
+
+        dirs = []
+        files = []
+        self.collect(self.src, self.dst, dirs, files)
+
+        for path in dirs:
+            os.makedirs(path, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            copied = sum(executor.map(lambda args: self.copy_file(*args), files))
+
+        staged = [os.path.relpath(dst, self.dst) for (src, dst, src_stat) in files]
+        removed = self.remove_stale_files(staged, previous, set(dirs))
+
+        if self.manifest_path:
+            self.save_manifest(staged)
+
+        logger.debug('Staged {} of {} files into {}, removed {}'.format(copied, len(files), self.dst, removed))
+        return staged
+
+
+def get_sync_manifest_path(config):
+    return os.path.join(config.build_dir, '.clickable', 'sync_manifest.json')
+
+
+def stage_tree(src, dst, ignore, manifest_path=None):
+    return Stager(src, dst, ignore, manifest_path).stage()
@@ -0,0 +1,72 @@
+import os
+
+from clickable.system.query import Query
+
+
+DPKG_STATUS = '/var/lib/dpkg/status'
+
+
+class PackagesInstalled(Query):
+    # Parsed status files, keyed by path, valid as long as the mtime matches
+    cache = {}
+
+    def __init__(self, packages, status_file=DPKG_STATUS):
+        self.packages = packages
+        self.status_file = status_file
+
+    def is_met(self):
+        return not self.get_missing_packages()
+
+    def get_missing_packages(self):
+        installed = self.get_installed_packages()
+
+        missing = []
+        for package in self.packages:
+            name, _, arch = package.partition(':')
+            archs = installed.get(name, set())
+
+            if not archs or (arch and not archs & {arch, 'all'}):
+                missing.append(package)
+
+        return missing
+
+    def get_installed_packages(self):
+        try:
+            mtime = os.stat(self.status_file).st_mtime_ns
+        except OSError:
+            return {}
+
+        cached = PackagesInstalled.cache.get(self.status_file, None)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(self.status_file, 'r', encoding='utf-8', errors='replace') as f:
+            installed = self.parse_status(f.read())
+
+        PackagesInstalled.cache[self.status_file] = (mtime, installed)
+        return installed
+
+    def parse_status(self, content):
+        '''
+        Maps the names of all installed packages to the set of their
+        installed architectures.
+        '''
+
+        installed = {}
+        for paragraph in content.split('\n\n'):
+            fields = {}
+            for line in paragraph.split('\n'):
+                if not line or line[0] in ' \t':
+                    continue
+
+                key, _, value = line.partition(':')
+                if key in ('Package', 'Architecture', 'Status'):
+                    fields[key] = value.strip()
+
+            if fields.get('Status', None) == 'install ok installed' and 'Package' in fields:
+                installed.setdefault(fields['Package'], set()).add(fields.get('Architecture', 'all'))
+
+        return installed
+
+    def get_user_instructions(self):
+        return None
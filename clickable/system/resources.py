@@ -0,0 +1,104 @@
+import os
+
+from clickable.logger import logger
+
+
+# Rough upper bound of memory a single compiler process needs
+MEMORY_PER_JOB = 1024 * 1024 * 1024  # bytes
+
+
+def read_file(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def get_cgroup_cpu_limit():
+    # cgroup v2
+    cpu_max = read_file('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+
+        return None
+
+    # cgroup v1
+    quota = read_file('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = read_file('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+
+    return None
+
+
+def get_available_cpus():
+    '''
+    Number of CPUs this process may use, honoring the CPU affinity and
+    cgroup quotas (e.g. when running in a CI container).
+    '''
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        limit = get_cgroup_cpu_limit()
+    except ValueError:
+        limit = None
+
+    if limit:
+        cpus = min(cpus, max(1, int(limit)))
+
+    return cpus
+
+
+def get_cgroup_memory_limit():
+    for path in ['/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes']:
+        limit = read_file(path)
+        if limit and limit != 'max':
+            return int(limit)
+
+    return None
+
+
+def get_available_memory():
+    memory = None
+
+    meminfo = read_file('/proc/meminfo')
+    if meminfo:
+        for line in meminfo.split('\n'):
+            if line.startswith('MemAvailable:'):
+                memory = int(line.split()[1]) * 1024
+
+    try:
+        limit = get_cgroup_memory_limit()
+    except ValueError:
+        limit = None
+
+    # cgroup v1 reports a huge number when there is no limit
+    if limit and (memory is None or limit < memory):
+        memory = limit
+
+    return memory
+
+
+def get_job_budget(parallel_builds=1):
+    '''
+    Number of jobs each of the parallel builds may run, so that all
+    builds together neither oversubscribe the CPUs nor the memory.
+    '''
+
+    jobs = get_available_cpus()
+
+    memory = get_available_memory()
+    if memory:
+        jobs = min(jobs, max(1, memory // MEMORY_PER_JOB))
+
+    budget = max(1, jobs // max(1, parallel_builds))
+    logger.debug('Using {} jobs for each of {} parallel build(s)'.format(budget, parallel_builds))
+
+    return budget
@@ -1,17 +1,17 @@
-import itertools
+import hashlib
+import sys
+import threading
 import subprocess
 import re
 import json
 import os
 import shlex
-import glob
 import shutil
-import inspect
-from os.path import dirname, basename, isfile, join
 
-from clickable.builders.base import Builder
-from clickable.logger import logger
+from clickable.logger import logger, get_log_prefix
 from clickable.exceptions import FileNotFoundException, ClickableException
+from clickable.docker_api import get_docker_api, DOCKER_API_ERRORS
+from clickable.file_index import FileIndex
 
 # TODO use these subprocess functions everywhere
 
@@ -36,52 +36,63 @@ def run_subprocess_call(cmd, shell=False, **args):
 
 
 def run_subprocess_check_call(cmd, shell=False, cwd=None, **args):
+    prefix = get_log_prefix()
+    if prefix:
+        return run_subprocess_prefixed(prepare_command(cmd, shell), prefix, shell=shell, cwd=cwd, **args)
+
     return subprocess.check_call(prepare_command(cmd, shell), shell=shell, cwd=cwd, **args)
 
 
-def run_subprocess_check_output(cmd, shell=False, **args):
-    return subprocess.check_output(prepare_command(cmd, shell), shell=shell, **args).decode()
+output_lock = threading.Lock()
 
 
-def find(names, cwd, temp_dir=None, build_dir=None, ignore_dir=None, extensions_only=False, depth=None):
-    found = []
-    searchpaths = []
-    searchpaths.append(cwd)
+def run_subprocess_prefixed(cmd, prefix, **args):
+    '''
+    Like subprocess.check_call, but prefixes every line of output, which
+    keeps the output of parallel builds apart.
+    '''
 
-    include_build_dir = False
-    if build_dir and not build_dir.startswith(os.path.realpath(cwd) + os.sep):
-        include_build_dir = True
-        searchpaths.append(build_dir)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **args)
+    for line in process.stdout:
+        with output_lock:
+            sys.stdout.write('[{}] {}'.format(prefix, line.decode(errors='replace')))
+            sys.stdout.flush()
 
-    for (root, dirs, files) in itertools.chain.from_iterable(os.walk(path, topdown=True) for path in searchpaths):
-        # Ignore hidden directories
-        new_dirs = []
-        for dir in dirs:
-            if os.path.join(root, dir) == build_dir or not dir[0] == '.':
-                new_dirs.append(dir)
+    returncode = process.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
 
-        dirs[:] = new_dirs
+    return returncode
 
-        if depth:
-            if include_build_dir and root.startswith(build_dir):
-                if root.count(os.sep) >= (build_dir.count(os.sep) + depth):
-                    del dirs[:]
-            elif root.startswith(cwd):
-                if root.count(os.sep) >= (cwd.count(os.sep) + depth):
-                    del dirs[:]
 
-        for name in files:
-            ok = (name in names)
+def run_subprocess_check_output(cmd, shell=False, **args):
+    return subprocess.check_output(prepare_command(cmd, shell), shell=shell, **args).decode()
+
 
-            if extensions_only:
-                ok = any([name.endswith(n) for n in names])
+def find(names, cwd, temp_dir=None, build_dir=None, ignore_dir=None, extensions_only=False, depth=None, ignore=()):
+    return find_all([(names, extensions_only)], cwd, temp_dir, build_dir, ignore_dir, depth, ignore)[0]
 
-            if ok:
-                if ignore_dir is not None and root.startswith(ignore_dir):
-                    continue
 
-                found.append(os.path.join(root, name))
+def find_all(queries, cwd, temp_dir=None, build_dir=None, ignore_dir=None, depth=None, ignore=()):
+    '''
+    Like find, but answers several queries of (names, extensions_only)
+    with a single pass over the (cached) project file index. Files and
+    dirs matching the ignore list (see the "ignore" config) are skipped.
+    '''
+
+    indexes = [FileIndex.get(cwd, depth, ignore_dir, build_dir, ignore)]
+    if build_dir and not build_dir.startswith(os.path.realpath(cwd) + os.sep):
+        indexes.append(FileIndex.get(build_dir, depth, ignore_dir, build_dir, ignore))
 
+    found = [[] for query in queries]
+    for index in indexes:
+        for idx, files in enumerate(index.find(queries)):
+            found[idx].extend(files)
+
+    return [pick_found_file(files, names, temp_dir, build_dir) for (files, (names, _)) in zip(found, queries)]
+
+
+def pick_found_file(found, names, temp_dir=None, build_dir=None):
     if not found:
         raise FileNotFoundException('Could not find {}'.format(', '.join(names)))
 
@@ -121,21 +132,6 @@ def env(name):
     return value
 
 
-def get_builders():
-    builder_classes = {}
-    builder_dir = join(dirname(__file__), 'builders')
-    modules = glob.glob(join(builder_dir, '*.py'))
-    builder_modules = [basename(f)[:-3] for f in modules if isfile(f) and not f.endswith('__init__.py')]
-
-    for name in builder_modules:
-        builder_submodule = __import__('clickable.builders.{}'.format(name), globals(), locals(), [name])
-        for name, cls in inspect.getmembers(builder_submodule):
-            if inspect.isclass(cls) and issubclass(cls, Builder) and cls.name:
-                builder_classes[cls.name] = cls
-
-    return builder_classes
-
-
 def get_make_jobs_from_args(make_args):
     for arg in flexible_string_to_list(make_args):
         if arg.startswith('-j'):
@@ -163,11 +159,35 @@ def flexible_string_to_list(variable):
     return variable
 
 
+# Compiled schema validators, keyed by the serialized schema
+schema_validators = {}
+
+
+def get_schema_validator(schema):
+    from jsonschema.validators import validator_for
+
+    key = json.dumps(schema, sort_keys=True)
+    if key not in schema_validators:
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        schema_validators[key] = validator_class(schema)
+
+    return schema_validators[key]
+
+
 def validate_clickable_json(config, schema):
+    '''
+    Returns whether the config could be validated, which is not the case
+    if jsonschema is missing.
+    '''
+
     try:
-        from jsonschema import validate, ValidationError
+        from jsonschema import ValidationError
+        from jsonschema.exceptions import best_match
         try:
-            validate(instance=config, schema=schema)
+            error = best_match(get_schema_validator(schema).iter_errors(config))
+            if error:
+                raise error
         except ValidationError as e:
             logger.error("The clickable.json configuration file is invalid!")
             error_message = e.message
@@ -180,15 +200,103 @@ def validate_clickable_json(config, schema):
             raise ClickableException(error_message)
     except ImportError:
         logger.warning("Dependency 'jsonschema' not found. Could not validate clickable.json.")
-        pass
+        return False
+
+    return True
+
+
+def log_docker_api_error(error):
+    logger.debug('Docker API request failed, falling back to the docker cli: {}'.format(error))
 
 
 def image_exists(image):
+    api = get_docker_api()
+    if api:
+        try:
+            return api.image_inspect(image) is not None
+        except DOCKER_API_ERRORS as e:
+            log_docker_api_error(e)
+
     command = 'docker image inspect {}'.format(image)
     return run_subprocess_call(command,
             stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL) == 0
 
 
+def get_image_id(image):
+    api = get_docker_api()
+    if api:
+        try:
+            info = api.image_inspect(image)
+            return info['Id'] if info else None
+        except DOCKER_API_ERRORS as e:
+            log_docker_api_error(e)
+
+    command = 'docker images -q --no-trunc {}'.format(image)
+    output = run_subprocess_check_output(command).strip()
+    return output.split('\n')[0] if output else None
+
+
+def pull_image(image):
+    api = get_docker_api()
+    if api:
+        try:
+            logger.info('Pulling {}'.format(image))
+            return api.image_pull(image)
+        except DOCKER_API_ERRORS as e:
+            log_docker_api_error(e)
+
+    command = 'docker pull {}'.format(image)
+    run_subprocess_check_call(command)
+
+
+def remove_image(image):
+    command = 'docker rmi {}'.format(image)
+    return run_subprocess_call(command,
+            stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL) == 0
+
+
+def get_image_history(image):
+    api = get_docker_api()
+    if api:
+        try:
+            return [layer['Id'] for layer in api.image_history(image)]
+        except DOCKER_API_ERRORS as e:
+            log_docker_api_error(e)
+
+    command = 'docker history -q --no-trunc {}'.format(image)
+    return run_subprocess_check_output(command).split()
+
+
+def get_image_label(image, label):
+    api = get_docker_api()
+    if api:
+        try:
+            info = api.image_inspect(image)
+            labels = info.get('Config', {}).get('Labels', None) if info else None
+            return labels.get(label, None) if labels else None
+        except DOCKER_API_ERRORS as e:
+            log_docker_api_error(e)
+
+    format_string = '{{{{ index .Config.Labels "{}"}}}}'.format(label)
+    command = "docker inspect --format '{}' {}".format(format_string, image)
+    logger.debug('Checking docker image label via: {}'.format(command))
+
+    return run_subprocess_check_output(command).strip()
+
+
+def get_image_config(image):
+    api = get_docker_api()
+    if api:
+        try:
+            info = api.image_inspect(image)
+            return info.get('Config', None) if info else None
+        except DOCKER_API_ERRORS as e:
+            log_docker_api_error(e)
+
+    command = "docker inspect --format '{{{{json .Config}}}}' {}".format(image)
+    return json.loads(run_subprocess_check_output(command).strip())
+
+
 def makedirs(path):
     os.makedirs(path, 0o777, True)
     return path
@@ -213,3 +321,51 @@ def is_sub_dir(path, parent):
     p1 = os.path.abspath(path)
     p2 = os.path.abspath(parent)
     return os.path.commonpath([p1, p2]).startswith(p2)
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def hash_tree(root, ignore=[], extensions=None, hash_file=hash_file):
+    '''
+    Digest over the relative paths and contents of all files below root.
+    Entries of ignore are either names or absolute paths, extensions
+    optionally restricts the digest to matching files (e.g. build system
+    files).
+    '''
+
+    ignore_paths = set(os.path.abspath(i) for i in ignore if os.path.isabs(i))
+    ignore_names = set(i for i in ignore if not os.path.isabs(i))
+
+    sha = hashlib.sha256()
+    for (path, dirs, files) in os.walk(root, topdown=True):
+        dirs[:] = sorted(
+            d for d in dirs
+            if d not in ignore_names and
+            os.path.join(path, d) not in ignore_paths
+        )
+
+        for name in sorted(files):
+            full_path = os.path.join(path, name)
+            if name in ignore_names or full_path in ignore_paths:
+                continue
+
+            if extensions is not None and not any(name.endswith(e) for e in extensions):
+                continue
+
+            if os.path.islink(full_path):
+                digest = 'link:{}'.format(os.readlink(full_path))
+            elif os.path.isfile(full_path):
+                digest = hash_file(full_path)
+            else:
+                continue
+
+            sha.update('{}\0{}\n'.format(os.path.relpath(full_path, root), digest).encode())
+
+    return sha.hexdigest()
@@ -0,0 +1,76 @@
+from unittest import TestCase
+import json
+import os
+import subprocess
+import sys
+
+
+STARTUP_SCRIPT = '''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import clickable
+clickable.Clickable()
+duration = time.perf_counter() - start
+
+print(json.dumps({
+    'duration': duration,
+    'modules': sorted(module for module in sys.modules if module.startswith('clickable.')),
+}))
+'''
+
+COMPLETION_SCRIPT = '''
+import subprocess
+import sys
+import time
+
+def spawn(*args, **kwargs):
+    raise AssertionError('Completion must not spawn subprocesses')
+
+subprocess.Popen = spawn
+sys.argv = ['clickable', 'bash-completion']
+
+start = time.perf_counter()
+import clickable
+clickable.main()
+sys.stderr.write(str(time.perf_counter() - start))
+'''
+
+
+class TestStartup(TestCase):
+    '''
+    Measures the time to import clickable and set up the command registry
+    in a fresh interpreter. Run with "pytest -s tests/benchmarks" to see the
+    numbers.
+    '''
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    def measure_startup(self):
+        output = subprocess.check_output([sys.executable, '-c', STARTUP_SCRIPT], cwd=self.root)
+        return json.loads(output.decode())
+
+    def measure_completion(self):
+        process = subprocess.run([sys.executable, '-c', COMPLETION_SCRIPT], cwd=self.root,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return process.stdout.decode(), float(process.stderr.decode().strip().split('\n')[-1])
+
+    def test_startup(self):
+        results = [self.measure_startup() for _ in range(3)]
+        duration = min(result['duration'] for result in results)
+        modules = results[0]['modules']
+
+        print('\nStartup: {:.1f} ms, {} clickable modules imported'.format(duration * 1000, len(modules)))
+
+        self.assertEqual([], [module for module in modules if module.startswith('clickable.commands.')])
+        self.assertEqual([], [module for module in modules if module.startswith('clickable.builders.')])
+
+    def test_completion(self):
+        results = [self.measure_completion() for _ in range(3)]
+        duration = min(duration for _, duration in results)
+
+        print('\nCompletion: {:.1f} ms'.format(duration * 1000))
+
+        self.assertIn('build', results[0][0].split())
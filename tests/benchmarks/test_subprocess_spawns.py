@@ -0,0 +1,135 @@
+from unittest import TestCase, mock
+import io
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+
+from clickable.commands.build import BuildCommand
+from clickable.container import Container
+from ..mocks import ConfigMock, true_fn
+
+
+INSTALL_LIB = ['/usr/lib/libfoo.so*', '/usr/lib/libbar.so*']
+
+
+class SpawnCounter(object):
+    def __init__(self, outputs=[]):
+        self.count = 0
+        self.outputs = outputs
+
+    def check_output(self, cmd, *args, **kwargs):
+        self.count += 1
+        if b'groups' in cmd or 'groups' in cmd:
+            return b'docker'
+        if any(b'nullglob' in arg for arg in cmd):
+            return ''.join(
+                'f{} {}\n'.format(index, pattern.rstrip('*'))
+                for index, pattern in enumerate(INSTALL_LIB)
+            ).encode()
+        return b''
+
+    def call(self, *args, **kwargs):
+        self.count += 1
+        return 0
+
+    def check_call(self, *args, **kwargs):
+        self.count += 1
+
+        # Pretend the build produced its output files
+        for output in self.outputs:
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            open(output, 'a').close()
+
+        return 0
+
+    def popen(self, *args, **kwargs):
+        self.count += 1
+        process = mock.Mock()
+        process.stdout = io.BytesIO()
+        with tarfile.open(fileobj=process.stdout, mode='w'):
+            pass
+        process.stdout.seek(0)
+        process.wait.return_value = 0
+        return process
+
+
+class TestSubprocessSpawns(TestCase):
+    '''
+    Counts the subprocesses spawned by a cmake build with a few install
+    patterns. Run with "pytest -s tests/benchmarks" to see the numbers.
+    '''
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config = ConfigMock(
+            mock_config_json={
+                'builder': 'cmake',
+                'build_dir': os.path.join(self.tmp_dir, 'build'),
+                'install_lib': INSTALL_LIB,
+            },
+            mock_config_env={},
+            mock_install_files=True,
+            commands=['build'],
+        )
+        self.config.container = Container(self.config)
+        self.config.interactive = False
+
+        self.stamp = os.path.join(self.tmp_dir, 'docker_check.json')
+        self.stamp_patcher = mock.patch('clickable.container.docker_check_stamp', self.stamp)
+        self.stamp_patcher.start()
+
+    def tearDown(self):
+        self.stamp_patcher.stop()
+        Container.docker_checked = False
+        shutil.rmtree(self.tmp_dir)
+
+    def count_build_spawns(self, cached):
+        counter = SpawnCounter([
+            os.path.join(self.config.build_dir, 'CMakeCache.txt'),
+        ])
+        Container.docker_checked = False
+
+        original_check_docker = Container.check_docker
+
+        def check_docker(container, retries=3):
+            # Without the cache every call does the full health check
+            if not cached:
+                Container.docker_checked = False
+                if os.path.exists(self.stamp):
+                    os.remove(self.stamp)
+            return original_check_docker(container, retries)
+
+        def pack(click_path):
+            # The click package is packed without spawning anything
+            open(click_path, 'a').close()
+
+        with mock.patch('subprocess.check_output', side_effect=counter.check_output), \
+                mock.patch('subprocess.call', side_effect=counter.call), \
+                mock.patch('subprocess.check_call', side_effect=counter.check_call), \
+                mock.patch('subprocess.Popen', side_effect=counter.popen), \
+                mock.patch('clickable.container.Container.docker_group_exists', side_effect=true_fn), \
+                mock.patch.object(Container, 'check_docker', autospec=True, side_effect=check_docker), \
+                mock.patch('clickable.click_packer.ClickPacker.pack', side_effect=pack):
+            BuildCommand(self.config).run()
+
+        return counter.count
+
+    def test_docker_check_cache(self):
+        uncached = self.count_build_spawns(cached=False)
+        cached = self.count_build_spawns(cached=True)
+
+        print('\nSubprocess spawns per build: {} without docker check cache, {} with docker check cache'.format(
+            uncached, cached))
+        self.assertLess(cached, uncached)
+
+    def test_incremental_build(self):
+        self.config.config['incremental'] = True
+
+        full = self.count_build_spawns(cached=True)
+        incremental = self.count_build_spawns(cached=True)
+
+        print('\nSubprocess spawns per build: {} for a full build, {} for an incremental build without changes'.format(
+            full, incremental))
+        self.assertLess(incremental, full)
@@ -12,7 +12,7 @@ class ClickableMock(Clickable):
         self.mock_install_files = mock_install_files
         super().__init__()
 
-    def setup_config(self, args, commands):
+    def setup_config(self, args, commands, parallel_builds=1):
         container_mode_key = "CLICKABLE_CONTAINER_MODE"
 
         if (self.mock_config_env is not None and
@@ -23,6 +23,7 @@ class ClickableMock(Clickable):
         return ConfigMock(
             args=args,
             commands=commands,
+            parallel_builds=parallel_builds,
             mock_config_json=self.mock_config_json,
             mock_config_env=self.mock_config_env,
             mock_install_files=self.mock_install_files,
@@ -11,26 +11,53 @@ class TestBuildCommand(UnitTest):
         super().setUp()
         self.setUpConfig()
         self.command = BuildCommand(self.config)
-        self.click_cmd = 'click build {} --no-validate'.format(self.config.install_dir)
 
-    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
-    def test_click_build(self, mock_run_command):
+    @mock.patch('clickable.click_packer.ClickPacker.pack')
+    def test_click_build(self, mock_pack):
         self.command.click_build()
 
-        mock_run_command.assert_called_once_with(self.click_cmd)
+        mock_pack.assert_called_once_with(self.command.click_path)
 
-    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    @mock.patch('clickable.click_packer.ClickPacker.pack')
     @mock.patch('os.path.exists', side_effect=false_fn)
     @mock.patch('os.makedirs', side_effect=empty_fn)
     @mock.patch('shutil.copyfile', side_effect=empty_fn)
-    def test_click_build_click_output(self, mock_copyfile, mock_makedirs, mock_exists, mock_run_command):
+    def test_click_build_click_output(self, mock_copyfile, mock_makedirs, mock_exists, mock_pack):
         self.config.click_output = '/foo/bar'
         self.command.click_build()
 
-        mock_run_command.assert_called_once_with(self.click_cmd)
+        mock_pack.assert_called_once_with(ANY)
         mock_exists.assert_called_with(ANY)
         mock_makedirs.assert_called_with(ANY)
         mock_copyfile.assert_called_with(ANY, ANY)
 
+    @mock.patch('clickable.container.Container.pull_files', side_effect=empty_fn)
+    @mock.patch('clickable.container.Container.run_command')
+    @mock.patch('clickable.commands.build.makedirs', side_effect=empty_fn)
+    def test_install_additional_files(self, mock_makedirs, mock_run_command, mock_pull_files):
+        self.config.install_lib = ['/usr/lib/libfoo.so*', '/usr/lib/libbar.so*']
+        self.config.install_qml = ['/usr/lib/qml/Foo/Bar']
+        mock_run_command.return_value = '\n'.join([
+            'f0 /usr/lib/libfoo.so',
+            'f0 /usr/lib/libfoo.so.1',
+            'f1 /usr/lib/libbar.so',
+            'f2 /usr/lib/qml/Foo/Bar',
+            'q0 module Foo.Bar',
+            'q0 plugin foobar',
+            'r0',
+        ])
+
+        self.command.install_additional_files()
+
+        mock_run_command.assert_called_once_with(ANY, get_output=True)
+        self.assertIn('for f in /usr/lib/libfoo.so*;', mock_run_command.call_args[0][0])
+        mock_pull_files.assert_any_call(
+            ['/usr/lib/libfoo.so', '/usr/lib/libfoo.so.1', '/usr/lib/libbar.so'],
+            self.config.app_lib_dir)
+        mock_pull_files.assert_any_call(
+            ['/usr/lib/qml/Foo/Bar'],
+            '{}/Foo'.format(self.config.app_qml_dir))
+        self.assertEqual(mock_pull_files.call_count, 2)
+
 
 # TODO implement more
@@ -1,7 +1,12 @@
 from unittest import mock
 from unittest.mock import ANY
 
+import os
+import tempfile
+import threading
+
 from clickable.commands.build_libs import LibBuildCommand
+from clickable.exceptions import ClickableException
 from .base_test import UnitTest
 from ..mocks import empty_fn, false_fn
 
@@ -22,10 +27,107 @@ class TestLibBuildCommand(UnitTest):
 
     @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
     @mock.patch('os.makedirs', side_effect=empty_fn)
-    def test_click_build(self, mock_makedirs, mock_run_command):
+    @mock.patch('clickable.build_manifest.get_image_id', side_effect=empty_fn)
+    @mock.patch('clickable.build_manifest.BuildManifest.save', side_effect=empty_fn)
+    def test_click_build(self, mock_save, mock_get_image_id, mock_makedirs, mock_run_command):
         self.command.run()
 
         mock_run_command.assert_called_once_with(self.custom_cmd)
         mock_makedirs.assert_called_with(ANY, exist_ok=True)
+        mock_save.assert_called_once_with()
+
+    @mock.patch('clickable.container.Container.run_command', side_effect=empty_fn)
+    @mock.patch('clickable.build_manifest.get_image_id', side_effect=empty_fn)
+    def test_skip_up_to_date(self, mock_get_image_id, mock_run_command):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.config.lib_configs[0].build_dir = tmp_dir
+            self.config.lib_configs[0].build_home = os.path.join(tmp_dir, 'home')
+            self.config.lib_configs[0].install_dir = os.path.join(tmp_dir, 'install')
+            os.makedirs(self.config.lib_configs[0].install_dir)
+
+            self.command.run()
+            self.command.run()
+            mock_run_command.assert_called_once_with(self.custom_cmd)
+
+            self.config.force_build = True
+            self.command.run()
+            self.assertEqual(2, mock_run_command.call_count)
+
+
+class TestLibBuildCommandDependencies(UnitTest):
+    def setUpLibs(self, libraries, lib_jobs=1):
+        self.setUpConfig(mock_config_json={
+            'libraries': {
+                name: {'builder': 'custom', 'build': 'make', 'depends_on': depends_on}
+                for name, depends_on in libraries.items()
+            },
+            'lib_jobs': lib_jobs,
+        })
+        self.command = LibBuildCommand(self.config)
+        self.built = []
+        self.lock = threading.Lock()
+
+    def build_lib(self, lib, prefix=None):
+        with self.lock:
+            self.built.append(lib.name)
+
+    def test_dependency_order(self):
+        self.setUpLibs({
+            'app-lib': ['foo', 'bar'],
+            'foo': ['bar'],
+            'bar': [],
+        })
+
+        with mock.patch.object(self.command, 'build_lib', side_effect=self.build_lib):
+            self.command.run()
+
+        self.assertEqual(['bar', 'foo', 'app-lib'], self.built)
+
+    def test_parallel(self):
+        self.setUpLibs({
+            'foo': [],
+            'bar': [],
+            'baz': ['foo', 'bar'],
+        }, lib_jobs=2)
+        barrier = threading.Barrier(2, timeout=5)
+
+        def build_lib(lib, prefix=None):
+            # foo and bar have to be built at the same time to pass the barrier
+            if lib.name != 'baz':
+                self.assertEqual(lib.name, prefix)
+                barrier.wait()
+
+            self.build_lib(lib, prefix)
+
+        with mock.patch.object(self.command, 'build_lib', side_effect=build_lib):
+            self.command.run()
+
+        self.assertEqual('baz', self.built[-1])
+
+    def test_failed_dependency(self):
+        self.setUpLibs({
+            'foo': [],
+            'bar': ['foo'],
+        })
+
+        def build_lib(lib, prefix=None):
+            self.build_lib(lib, prefix)
+            raise ClickableException('Build failed')
+
+        with mock.patch.object(self.command, 'build_lib', side_effect=build_lib):
+            with self.assertRaises(ClickableException):
+                self.command.run()
+
+        self.assertEqual(['foo'], self.built)
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ClickableException):
+            self.setUpLibs({'foo': ['bar']})
 
-# TODO implement more
+    def test_circular_dependency(self):
+        with self.assertRaises(ClickableException):
+            self.setUpLibs({
+                'foo': ['bar'],
+                'bar': ['baz'],
+                'baz': ['foo'],
+            })
@@ -0,0 +1,97 @@
+from unittest import TestCase, mock
+import os
+import shutil
+import tempfile
+
+from clickable.build_manifest import BuildManifest, create_build_manifest
+
+
+class TestBuildManifest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src_dir = os.path.join(self.tmp_dir, 'src')
+        self.path = os.path.join(self.tmp_dir, 'build', '.clickable', 'build_manifest.json')
+
+        os.makedirs(os.path.join(self.src_dir, '.git'))
+        self.write('main.cpp', 'int main() {}')
+        self.write('.git/HEAD', 'ref: refs/heads/master')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, content):
+        with open(os.path.join(self.src_dir, name), 'w') as f:
+            f.write(content)
+
+    def build(self, step, depends=[]):
+        manifest = BuildManifest(self.path)
+        inputs = {'sources': manifest.hash_tree(self.src_dir, ['.git'])}
+        if manifest.is_up_to_date(step, inputs, depends=depends):
+            return False
+
+        manifest.record(step)
+        return True
+
+    def test_skip_unchanged_step(self):
+        self.assertTrue(self.build('make'))
+        self.assertFalse(self.build('make'))
+
+    def test_rerun_changed_step(self):
+        self.assertTrue(self.build('make'))
+
+        self.write('main.cpp', 'int main() { return 1; }')
+        self.assertTrue(self.build('make'))
+
+    def test_ignored_files(self):
+        self.assertTrue(self.build('make'))
+
+        self.write('.git/HEAD', 'ref: refs/heads/feature')
+        self.assertFalse(self.build('make'))
+
+    def test_missing_output(self):
+        manifest = BuildManifest(self.path)
+        self.assertFalse(manifest.is_up_to_date('make', {}))
+        manifest.record('make')
+
+        manifest = BuildManifest(self.path)
+        self.assertTrue(manifest.is_up_to_date('make', {}))
+        self.assertFalse(manifest.is_up_to_date('make', {}, [os.path.join(self.tmp_dir, 'missing')]))
+
+    def test_depends(self):
+        manifest = BuildManifest(self.path)
+        manifest.is_up_to_date('configure', {})
+        manifest.record('configure')
+        manifest.is_up_to_date('make', {})
+        manifest.record('make')
+
+        manifest = BuildManifest(self.path)
+        self.assertTrue(manifest.is_up_to_date('make', {}, depends=['configure']))
+
+        manifest.ran.add('configure')
+        self.assertFalse(manifest.is_up_to_date('make', {}, depends=['configure']))
+
+    def test_common_inputs(self):
+        manifest = BuildManifest(self.path, {'image': 'sha256:a'})
+        manifest.is_up_to_date('make', {})
+        manifest.record('make')
+
+        manifest = BuildManifest(self.path, {'image': 'sha256:b'})
+        self.assertFalse(manifest.is_up_to_date('make', {}))
+
+    def test_prune_file_cache(self):
+        self.write('old.cpp', 'int old() {}')
+        self.assertTrue(self.build('make'))
+        self.assertIn(os.path.join(self.src_dir, 'old.cpp'), BuildManifest(self.path).files)
+
+        os.remove(os.path.join(self.src_dir, 'old.cpp'))
+        self.assertTrue(self.build('make'))
+        self.assertNotIn(os.path.join(self.src_dir, 'old.cpp'), BuildManifest(self.path).files)
+        self.assertIn(os.path.join(self.src_dir, 'main.cpp'), BuildManifest(self.path).files)
+
+    @mock.patch('clickable.build_manifest.get_image_id')
+    def test_container_free_build(self, mock_get_image_id):
+        config = mock.Mock(container_mode=False, config={}, build_dir=self.tmp_dir)
+        config.is_container_free_build.return_value = True
+
+        self.assertIsNone(create_build_manifest(config).common_inputs['image'])
+        mock_get_image_id.assert_not_called()
@@ -0,0 +1,109 @@
+from unittest import TestCase, mock
+import os
+import shutil
+import tempfile
+
+from clickable.click_cache import ClickCache
+from clickable.commands.build import BuildCommand
+from ..mocks import empty_fn
+from .base_test import UnitTest
+
+
+class TestClickCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ClickCache(os.path.join(self.tmp_dir, 'cache'), 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def create_click(self, name, size):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'0' * size)
+
+        return path
+
+    def test_get_put(self):
+        key = ClickCache.get_key('abc', 'armhf', 'ubuntu-sdk-16.04')
+        self.assertIsNone(self.cache.get(key, 'foo.click'))
+
+        self.cache.put(key, self.create_click('foo.click', 10))
+        self.assertTrue(os.path.isfile(self.cache.get(key, 'foo.click')))
+
+    def test_key(self):
+        self.assertNotEqual(
+            ClickCache.get_key('abc', 'armhf', 'ubuntu-sdk-16.04'),
+            ClickCache.get_key('abc', 'arm64', 'ubuntu-sdk-16.04'),
+        )
+
+    def test_reviewed(self):
+        key = ClickCache.get_key('abc', 'armhf', 'ubuntu-sdk-16.04')
+        self.cache.put(key, self.create_click('foo.click', 10))
+
+        self.assertFalse(self.cache.is_reviewed(key))
+        self.cache.set_reviewed(key)
+        self.assertTrue(self.cache.is_reviewed(key))
+
+    def test_evict_least_recently_used(self):
+        keys = [ClickCache.get_key(str(i), 'armhf', 'ubuntu-sdk-16.04') for i in range(3)]
+
+        self.cache.put(keys[0], self.create_click('0.click', 400))
+        self.cache.put(keys[1], self.create_click('1.click', 400))
+        os.utime(self.cache.get_entry_dir(keys[0]), (1, 1))
+        os.utime(self.cache.get_entry_dir(keys[1]), (2, 2))
+
+        self.cache.put(keys[2], self.create_click('2.click', 400))
+
+        self.assertIsNone(self.cache.get(keys[0], '0.click'))
+        self.assertIsNotNone(self.cache.get(keys[1], '1.click'))
+        self.assertIsNotNone(self.cache.get(keys[2], '2.click'))
+
+
+class TestBuildCommandClickCache(UnitTest):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.setUpConfig(mock_config_json={
+            'build_dir': os.path.join(self.tmp_dir, 'build'),
+        })
+        self.config.click_cache = True
+        os.makedirs(self.config.install_dir)
+
+        self.command = BuildCommand(self.config)
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def get_click_cache(self):
+        if not self.command.click_cache_key:
+            return None
+
+        return ClickCache(self.cache_dir, 1024 * 1024)
+
+    def test_click_build_cached(self):
+        def pack(click_path):
+            open(click_path, 'w').close()
+
+        with mock.patch.object(self.command, 'get_click_cache', side_effect=self.get_click_cache), \
+                mock.patch('clickable.click_packer.ClickPacker.pack', side_effect=pack) as mock_pack:
+            self.command.click_build()
+            os.remove(self.command.click_path)
+            self.command.click_build()
+
+        mock_pack.assert_called_once_with(self.command.click_path)
+        self.assertTrue(os.path.isfile(self.command.click_path))
+
+    @mock.patch('clickable.commands.review.ReviewCommand.check', return_value=0)
+    def test_review_cached(self, mock_check):
+        with mock.patch.object(self.command, 'get_click_cache', side_effect=self.get_click_cache), \
+                mock.patch('clickable.container.Container.run_command', side_effect=empty_fn):
+            self.command.click_cache_key = 'abc'
+            self.command.click_path = __file__
+            self.get_click_cache().put('abc', __file__)
+
+            self.command.review()
+            self.command.review()
+
+        mock_check.assert_called_once_with(self.command.click_path, raise_on_error=False)
@@ -0,0 +1,123 @@
+from unittest import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+
+from clickable.click_packer import ClickPacker, get_control_digest
+from clickable.exceptions import ClickableException
+
+
+def read_ar(path):
+    members = {}
+    with open(path, 'rb') as f:
+        assert f.read(8) == b'!<arch>\n'
+        while True:
+            header = f.read(60)
+            if not header:
+                break
+
+            name = header[:16].decode().strip()
+            size = int(header[48:58].decode())
+            members[name] = f.read(size)
+            if size % 2:
+                f.read(1)
+
+    return members
+
+
+class TestClickPacker(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.install_dir = os.path.join(self.tmp_dir, 'install')
+        self.click_path = os.path.join(self.tmp_dir, 'foo.bar_1.0_all.click')
+
+        self.manifest = {
+            'name': 'foo.bar',
+            'version': '1.0',
+            'title': 'Foo',
+            'maintainer': 'Foo Bar <foo@bar.com>',
+            'framework': 'ubuntu-sdk-16.04',
+            'architecture': 'all',
+            'hooks': {'foo': {'desktop': 'foo.desktop'}},
+        }
+        self.write('manifest.json', json.dumps(self.manifest))
+        self.write('foo.desktop', '[Desktop Entry]')
+        self.write('qml/Main.qml', 'Item {}')
+        self.write('.git/HEAD', 'ref')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, path, content):
+        path = os.path.join(self.install_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_pack(self):
+        ClickPacker(self.install_dir).pack(self.click_path)
+
+        members = read_ar(self.click_path)
+        self.assertEqual(['debian-binary', '_click-binary', 'control.tar.gz', 'data.tar.gz'], list(members))
+        self.assertEqual(b'2.0\n', members['debian-binary'])
+        self.assertEqual(b'0.4\n', members['_click-binary'])
+
+        with tarfile.open(fileobj=io.BytesIO(members['data.tar.gz'])) as data:
+            self.assertEqual(['.', './foo.desktop', './qml', './qml/Main.qml'], data.getnames())
+            self.assertEqual(0, data.getmember('./qml/Main.qml').uid)
+
+        with tarfile.open(fileobj=io.BytesIO(members['control.tar.gz'])) as control:
+            self.assertEqual(['.', './control', './manifest', './md5sums', './preinst'], control.getnames())
+
+            md5sums = control.extractfile('./md5sums').read().decode()
+            self.assertEqual('{}  qml/Main.qml\n'.format(hashlib.md5(b'Item {}').hexdigest()), md5sums.split('\n', 1)[1])
+
+            fields = control.extractfile('./control').read().decode()
+            self.assertIn('Package: foo.bar\n', fields)
+            self.assertIn('Architecture: all\n', fields)
+
+            manifest = json.loads(control.extractfile('./manifest').read().decode())
+            self.assertTrue(manifest['installed-size'].isdigit())
+
+    def test_missing_manifest_keys(self):
+        del self.manifest['maintainer']
+        self.write('manifest.json', json.dumps(self.manifest))
+
+        with self.assertRaisesRegex(ClickableException, 'maintainer'):
+            ClickPacker(self.install_dir).pack(self.click_path)
+
+        self.assertFalse(os.path.exists(self.click_path))
+
+    def test_reproducible(self):
+        first = os.path.join(self.tmp_dir, 'first.click')
+        ClickPacker(self.install_dir, source_date_epoch=1000).pack(first)
+
+        qml = os.path.join(self.install_dir, 'qml/Main.qml')
+        os.utime(qml, (2000, 2000))
+        os.chmod(qml, 0o600)
+        ClickPacker(self.install_dir, source_date_epoch=1000).pack(self.click_path)
+
+        with open(first, 'rb') as f1, open(self.click_path, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+        with tarfile.open(fileobj=io.BytesIO(read_ar(self.click_path)['data.tar.gz'])) as data:
+            self.assertEqual(1000, data.getmember('./qml/Main.qml').mtime)
+            self.assertEqual(0o644, data.getmember('./qml/Main.qml').mode)
+
+    def test_control_digest(self):
+        ClickPacker(self.install_dir).pack(self.click_path)
+        digest = get_control_digest(self.click_path)
+
+        # The digest only depends on the manifest and the file contents
+        os.utime(os.path.join(self.install_dir, 'qml/Main.qml'), (2000, 2000))
+        other = os.path.join(self.tmp_dir, 'other.click')
+        ClickPacker(self.install_dir).pack(other)
+        self.assertEqual(digest, get_control_digest(other))
+
+        self.write('qml/Main.qml', 'Item { id: root }')
+        ClickPacker(self.install_dir).pack(other)
+        self.assertNotEqual(digest, get_control_digest(other))
@@ -0,0 +1,56 @@
+from unittest import TestCase, mock
+import json
+import os
+import shutil
+import tempfile
+
+from clickable.completion import get_completion_words
+
+
+class TestCompletion(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.tmp_dir, 'clickable.json')
+        self.cache_patcher = mock.patch('clickable.completion.completion_cache',
+                os.path.join(self.tmp_dir, 'completion_cache.json'))
+        self.cache_patcher.start()
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_config(self, scripts, mtime):
+        with open(self.config_path, 'w') as f:
+            json.dump({'builder': 'cmake', 'scripts': scripts}, f)
+
+        os.utime(self.config_path, ns=(mtime, mtime))
+
+    def test_scripts(self):
+        self.write_config({'fetch': 'git submodule update'}, 1000)
+        words = get_completion_words('bash-completion', cwd=self.tmp_dir)
+
+        self.assertIn('fetch', words)
+        self.assertIn('build', words)
+        self.assertIn('--arch', words)
+
+    def test_cached_by_mtime(self):
+        self.write_config({'fetch': 'git submodule update'}, 1000)
+        get_completion_words('bash-completion', self.config_path)
+
+        # Same mtime, the cached scripts are used
+        self.write_config({'other': 'true'}, 1000)
+        self.assertIn('fetch', get_completion_words('bash-completion', self.config_path))
+
+        self.write_config({'other': 'true'}, 2000)
+        words = get_completion_words('bash-completion', self.config_path)
+        self.assertIn('other', words)
+        self.assertNotIn('fetch', words)
+
+    def test_no_config(self):
+        words = get_completion_words('bash-completion', cwd=self.tmp_dir)
+        self.assertIn('build', words)
+
+    def test_desktop(self):
+        words = get_completion_words('bash-completion-desktop')
+        self.assertIn('--gdbserver', words)
+        self.assertNotIn('build', words)
@@ -1,6 +1,10 @@
 from unittest import TestCase, mock
 from unittest.mock import ANY
+import json
 import multiprocessing
+import os
+import shutil
+import tempfile
 
 from clickable.commands.clean import CleanCommand
 from clickable.container import Container
@@ -56,3 +60,53 @@ class TestConfigCommand(TestCase):
 
         self.config.set_conditional_defaults()
         self.assertEqual(self.config.arch, 'arm64')
+
+    def test_setup_ccache(self):
+        self.config.arch = 'arm64'
+        self.config.config['ccache'] = True
+        self.config.setup_ccache()
+
+        self.assertTrue(self.config.ccache_dir.endswith('/.clickable/ccache/arm64-{}'.format(
+            Constants.framework_image_mapping[self.config.framework])))
+        self.assertIn('ccache', self.config.dependencies_host)
+
+    def test_container_free_build(self):
+        self.config.container_mode = False
+        self.config.is_custom_docker_image = False
+        self.config.commands = ['build']
+        self.config.builder = Constants.PURE
+        self.config.skip_review = True
+        self.assertFalse(self.config.needs_clickable_image())
+
+        self.config.install_lib = ['/usr/lib/libfoo.so*']
+        self.assertTrue(self.config.needs_clickable_image())
+
+        self.config.install_lib = []
+        self.config.install_data = {'data.txt': 'share'}
+        self.assertFalse(self.config.is_container_free_build())
+        self.assertTrue(self.config.needs_clickable_image())
+
+        self.config.install_data = {}
+        self.config.builder = Constants.CMAKE
+        self.assertTrue(self.config.needs_clickable_image())
+
+    def test_validation_cache(self):
+        tmp_dir = tempfile.mkdtemp()
+        config_path = os.path.join(tmp_dir, 'clickable.json')
+
+        def write_config(config):
+            with open(config_path, 'w') as f:
+                json.dump(config, f)
+
+        with mock.patch('clickable.config.project.config_validation_cache', os.path.join(tmp_dir, 'cache.json')), \
+                mock.patch('clickable.config.project.validate_clickable_json', return_value=True) as mock_validate:
+            write_config({'builder': 'cmake'})
+            self.assertEqual('cmake', self.config.load_json_config(config_path)['builder'])
+            self.config.load_json_config(config_path)
+            self.assertEqual(1, mock_validate.call_count)
+
+            write_config({'builder': 'qmake'})
+            self.assertEqual('qmake', self.config.load_json_config(config_path)['builder'])
+            self.assertEqual(2, mock_validate.call_count)
+
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,202 @@
+from unittest import mock
+from unittest.mock import ANY
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+
+from clickable.container import Container
+from clickable.exceptions import ClickableException
+from ..mocks import empty_fn, false_fn
+from .base_test import UnitTest
+
+
+def container_id_fn(*args, **kwargs):
+    return 'abc123\n'
+
+
+def fingerprint_fn(*args, **kwargs):
+    return {'user': 'foo', 'socket_inode': 1, 'group_mtime': 2.0}
+
+
+class TestContainer(UnitTest):
+    def setUp(self):
+        self.setUpWithTmpBuildDir()
+        self.config.persistent_container = True
+        Container.sessions.clear()
+
+    def tearDown(self):
+        Container.sessions.clear()
+        Container.docker_checked = False
+        super().tearDown()
+
+    @mock.patch('clickable.container.Container.check_docker', side_effect=empty_fn)
+    @mock.patch('clickable.container.run_subprocess_check_output', side_effect=container_id_fn)
+    @mock.patch('subprocess.check_call', side_effect=empty_fn)
+    def test_persistent_container_reused(self, mock_check_call, mock_check_output, mock_check_docker):
+        self.config.container.run_command('make')
+        self.config.container.run_command('make install')
+
+        mock_check_output.assert_called_once_with(ANY)
+        self.assertIn('docker run -d --rm', mock_check_output.call_args[0][0])
+        self.assertEqual(mock_check_call.call_count, 2)
+
+        wrapped_command = mock_check_call.call_args[0][0]
+        self.assertEqual(wrapped_command[:2], ['docker', 'exec'])
+        self.assertIn('abc123', wrapped_command)
+
+    @mock.patch('clickable.container.run_subprocess_call', side_effect=empty_fn)
+    def test_stop_sessions(self, mock_run_subprocess_call):
+        Container.sessions['key'] = 'abc123'
+        Container.stop_sessions()
+
+        mock_run_subprocess_call.assert_called_once_with('docker rm -f abc123', stdout=ANY, stderr=ANY)
+        self.assertEqual(Container.sessions, {})
+
+    @mock.patch('clickable.container.Container.get_docker_check_fingerprint', side_effect=fingerprint_fn)
+    @mock.patch('clickable.container.Container.needs_docker_setup', side_effect=false_fn)
+    @mock.patch('clickable.container.run_subprocess_check_output', side_effect=empty_fn)
+    def test_check_docker_cached(self, mock_check_output, mock_needs_docker_setup, mock_fingerprint):
+        tmp_dir = tempfile.mkdtemp()
+        self.config.container.docker_mode = True
+
+        with mock.patch('clickable.container.docker_check_stamp', os.path.join(tmp_dir, 'docker_check.json')):
+            Container.docker_checked = False
+            self.config.container.check_docker()
+            self.config.container.check_docker()
+            self.assertEqual(mock_check_output.call_count, 1)
+
+            # A new process only relies on the on-disk stamp
+            Container.docker_checked = False
+            self.config.container.check_docker()
+            self.assertEqual(mock_check_output.call_count, 1)
+
+        shutil.rmtree(tmp_dir)
+
+    @mock.patch('clickable.container.Container.check_docker', side_effect=empty_fn)
+    @mock.patch('clickable.container.run_subprocess_check_output', side_effect=container_id_fn)
+    @mock.patch('subprocess.Popen')
+    def test_pull_files(self, mock_popen, mock_check_output, mock_check_docker):
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w') as tar:
+            for name in ['libfoo.so', 'libbar.so']:
+                info = tarfile.TarInfo(name)
+                info.size = 3
+                tar.addfile(info, io.BytesIO(b'foo'))
+        archive.seek(0)
+        data = archive.getvalue()
+
+        mock_popen.return_value.stdout = archive
+        mock_popen.return_value.wait.return_value = 0
+
+        tmp_dir = tempfile.mkdtemp()
+        self.config.container.pull_files(['/usr/lib/libfoo.so', '/opt/lib/libbar.so'], tmp_dir)
+
+        mock_check_output.assert_called_once_with(ANY)
+        mock_popen.assert_called_once_with(ANY, stdout=ANY)
+        command = mock_popen.call_args[0][0]
+        self.assertEqual(command[:2], ['docker', 'exec'])
+        self.assertEqual(command[-8:], ['tar', 'c', '-C', '/usr/lib', 'libfoo.so', '-C', '/opt/lib', 'libbar.so'])
+        self.assertEqual(sorted(os.listdir(tmp_dir)), ['libbar.so', 'libfoo.so'])
+
+        # tar fails on missing files, but still writes a valid archive
+        mock_popen.return_value.stdout = io.BytesIO(data)
+        mock_popen.return_value.wait.return_value = 2
+        with self.assertRaises(ClickableException):
+            self.config.container.pull_files(['/usr/lib/libfoo.so', '/opt/lib/libbar.so'], tmp_dir)
+
+        shutil.rmtree(tmp_dir)
+
+    def test_ccache_mount(self):
+        self.config.ccache_dir = tempfile.mkdtemp()
+        try:
+            mounts = self.config.container.get_docker_mounts()
+
+            self.assertEqual(self.config.ccache_dir, mounts['/ccache'])
+            self.assertEqual('/ccache', self.config.get_env_vars()['CCACHE_DIR'])
+        finally:
+            shutil.rmtree(self.config.ccache_dir)
+
+    @mock.patch('clickable.container.get_available_cpus', return_value=64)
+    def test_cpus_option(self, mock_get_available_cpus):
+        self.config.config['make_jobs'] = '16'
+        self.assertEqual('', self.config.container.get_cpus_option())
+
+        self.config.parallel_builds = 4
+        self.assertEqual('--cpus 16', self.config.container.get_cpus_option())
+        self.assertEqual('16', self.config.get_env_vars()['CARGO_BUILD_JOBS'])
+
+    @mock.patch('clickable.container.Container.check_docker', side_effect=empty_fn)
+    @mock.patch('clickable.container.Container.write_image_files', side_effect=empty_fn)
+    @mock.patch('clickable.container.get_image_id', return_value='sha256:base')
+    @mock.patch('clickable.container.image_exists', return_value=True)
+    @mock.patch('clickable.container.get_derived_images')
+    @mock.patch('subprocess.check_call', side_effect=empty_fn)
+    def test_customized_image_shared(self, mock_check_call, mock_get_derived_images, mock_image_exists,
+            mock_get_image_id, mock_write_image_files, mock_check_docker):
+        self.config.config['dependencies_host'] = ['b', 'a']
+        self.config.config['dependencies_target'] = ['c']
+        self.config.container.setup_customized_image()
+        image = self.config.container.docker_image
+
+        self.config.config['dependencies_host'] = ['a', 'b', 'a']
+        other = Container(self.config)
+        other.setup_customized_image()
+
+        self.assertEqual(image, other.docker_image)
+        self.assertTrue(image.startswith('{}-'.format(self.config.docker_image)))
+        mock_check_call.assert_not_called()
+
+        dockerfile = mock_write_image_files.call_args[0][0]
+        self.assertIn('RUN apt-get update && apt-get install -y --force-yes --no-install-recommends a b && apt-get clean', dockerfile)
+        self.assertIn('RUN apt-get update && apt-get install -y --force-yes --no-install-recommends c:{} && apt-get clean'.format(
+            self.config.arch), dockerfile)
+
+    @mock.patch('clickable.container.Container.check_docker', side_effect=empty_fn)
+    @mock.patch('clickable.container.Container.write_image_files', side_effect=empty_fn)
+    @mock.patch('clickable.container.get_image_id', return_value='sha256:base')
+    @mock.patch('clickable.container.get_image_config', return_value={'Cmd': ['bash'], 'Entrypoint': None})
+    @mock.patch('clickable.container.image_exists', return_value=False)
+    @mock.patch('clickable.container.get_derived_images')
+    @mock.patch('clickable.container.run_subprocess_check_output', side_effect=container_id_fn)
+    @mock.patch('clickable.container.run_subprocess_check_call', side_effect=empty_fn)
+    @mock.patch('clickable.container.run_subprocess_call', side_effect=empty_fn)
+    def test_apt_cache_image(self, mock_call, mock_check_call, mock_check_output, mock_get_derived_images,
+            mock_image_exists, mock_get_image_config, mock_get_image_id, mock_write_image_files, mock_check_docker):
+        self.config.apt_cache_dir = tempfile.mkdtemp()
+        self.config.config['dependencies_host'] = ['a']
+        self.config.image_setup = {'run': ['echo "a \\"b\\" $HOME `pwd`" > /tmp/c']}
+        try:
+            self.config.container.setup_customized_image()
+        finally:
+            shutil.rmtree(self.config.apt_cache_dir)
+
+        creates = [call[0][0] for call in mock_check_output.call_args_list]
+        self.assertEqual(3, len(creates))
+        self.assertEqual(['docker', 'create', '-v', '{}:/apt-cache:Z'.format(self.config.apt_cache_dir)],
+                         creates[1][:4])
+        self.assertEqual(['bash', '-c'], creates[1][-3:-1])
+        self.assertIn('-o Dir::Cache::Archives=/apt-cache/archives a', creates[1][-1])
+        self.assertIn('chown -R {}:{} /apt-cache'.format(os.getuid(), os.getgid()), creates[1][-1])
+
+        # Quotes, backslashes and substitutions reach bash unchanged
+        self.assertTrue(creates[2][-1].startswith('echo "a \\"b\\" $HOME `pwd`" > /tmp/c\n'))
+
+        commits = [call[0][0] for call in mock_check_call.call_args_list if 'commit' in call[0][0]]
+        self.assertEqual(['docker', 'commit', '--change', 'CMD ["bash"]', '--change', 'ENTRYPOINT []',
+                          'abc123', self.config.container.docker_image], commits[-1])
+
+    def test_apt_lists_fresh(self):
+        stamp = os.path.join(tempfile.mkdtemp(), 'apt_update_stamp')
+        with mock.patch('clickable.container.apt_update_stamp', stamp):
+            self.config.config['apt_update_max_age'] = 3600
+            self.assertFalse(self.config.container.are_apt_lists_fresh())
+
+            self.config.container.write_apt_update_stamp()
+            self.assertTrue(self.config.container.are_apt_lists_fresh())
+
+            self.config.config['apt_update_max_age'] = 0
+            self.assertFalse(self.config.container.are_apt_lists_fresh())
+
+        shutil.rmtree(os.path.dirname(stamp))
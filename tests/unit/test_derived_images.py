@@ -0,0 +1,51 @@
+from unittest import TestCase, mock
+import os
+import shutil
+import tempfile
+import time
+
+from clickable.derived_images import DerivedImages
+
+
+class TestDerivedImages(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.images = DerivedImages(os.path.join(self.tmp_dir, 'derived_images.json'), ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def set_last_used(self, image, last_used):
+        images = self.images.load()
+        images[image]['last_used'] = last_used
+        self.images.save(images)
+
+    @mock.patch('clickable.derived_images.image_exists', return_value=True)
+    @mock.patch('clickable.derived_images.remove_image', return_value=True)
+    def test_collect_garbage(self, mock_remove_image, mock_image_exists):
+        self.images.touch('base-old', 'base')
+        self.images.touch('base-kept', 'base')
+        self.images.touch('base-recent', 'base')
+        self.set_last_used('base-old', time.time() - 120)
+        self.set_last_used('base-kept', time.time() - 120)
+
+        self.images.collect_garbage(keep=['base-kept'])
+
+        mock_remove_image.assert_called_once_with('base-old')
+        self.assertEqual(['base-kept', 'base-recent'], sorted(self.images.load()))
+
+    @mock.patch('clickable.derived_images.image_exists', return_value=True)
+    @mock.patch('clickable.derived_images.remove_image', return_value=False)
+    def test_image_in_use(self, mock_remove_image, mock_image_exists):
+        self.images.touch('base-old', 'base')
+        self.set_last_used('base-old', 0)
+
+        self.images.collect_garbage()
+
+        self.assertEqual(['base-old'], list(self.images.load()))
+
+    def test_invalid_registry(self):
+        with open(self.images.path, 'w') as f:
+            f.write('{')
+
+        self.assertEqual({}, self.images.load())
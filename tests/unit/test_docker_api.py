@@ -0,0 +1,87 @@
+from unittest import TestCase, mock
+from unittest.mock import Mock
+import json
+
+from clickable.docker_api import DockerApi, DockerApiException
+from clickable.utils import image_exists, get_image_id, get_image_history, pull_image
+
+
+class FakeResponse(object):
+    def __init__(self, status, data):
+        self.status = status
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class TestDockerApi(TestCase):
+    def setUp(self):
+        self.api = DockerApi('/nonexistent/docker.sock')
+        self.api.send = Mock()
+
+    def respond(self, status, data):
+        self.api.send.return_value = FakeResponse(status, json.dumps(data).encode())
+
+    def test_image_inspect(self):
+        self.respond(200, {'Id': 'sha256:abc'})
+
+        self.assertEqual(self.api.image_inspect('foo'), {'Id': 'sha256:abc'})
+        self.api.send.assert_called_once_with('GET', '/images/foo/json', None, {})
+
+    def test_image_inspect_not_found(self):
+        self.respond(404, {'message': 'No such image'})
+
+        self.assertIsNone(self.api.image_inspect('foo'))
+
+    def test_error(self):
+        self.respond(500, {'message': 'broken'})
+
+        with self.assertRaises(DockerApiException):
+            self.api.image_history('foo')
+
+    def test_utils_use_api(self):
+        self.respond(200, {'Id': 'sha256:abc'})
+
+        with mock.patch('clickable.utils.get_docker_api', return_value=self.api), \
+                mock.patch('clickable.utils.run_subprocess_check_output') as mock_check_output:
+            self.assertTrue(image_exists('foo'))
+            self.assertEqual(get_image_id('foo'), 'sha256:abc')
+
+            self.respond(200, [{'Id': 'sha256:abc'}, {'Id': '<missing>'}])
+            self.assertEqual(get_image_history('foo'), ['sha256:abc', '<missing>'])
+
+            mock_check_output.assert_not_called()
+
+    def test_utils_fall_back_to_cli(self):
+        self.api.send.side_effect = ConnectionRefusedError()
+
+        with mock.patch('clickable.utils.get_docker_api', return_value=self.api), \
+                mock.patch('clickable.utils.run_subprocess_check_output', return_value='sha256:abc\n'):
+            self.assertEqual(get_image_id('foo'), 'sha256:abc')
+
+    def test_quote_image(self):
+        self.respond(200, {'Id': 'sha256:abc'})
+
+        self.api.image_inspect('registry:5000/foo:bar')
+        self.api.send.assert_called_once_with('GET', '/images/registry%3A5000/foo%3Abar/json', None, {})
+
+    def test_image_pull(self):
+        self.api.send.return_value = FakeResponse(200, b'{"status": "Pulling fs layer"}\r\n{"status": "Done"}\r\n')
+
+        self.api.image_pull('clickable/ubuntu-sdk:16.04-amd64')
+        self.api.send.assert_called_once_with(
+            'POST', '/images/create?fromImage=clickable%2Fubuntu-sdk&tag=16.04-amd64', None, {})
+
+        self.api.send.return_value = FakeResponse(200, b'{"error": "manifest unknown"}\r\n')
+        with self.assertRaises(DockerApiException):
+            self.api.image_pull('clickable/ubuntu-sdk:16.04-amd64')
+
+    def test_pull_image_falls_back_to_cli(self):
+        self.api.send.side_effect = ConnectionRefusedError()
+
+        with mock.patch('clickable.utils.get_docker_api', return_value=self.api), \
+                mock.patch('clickable.utils.run_subprocess_check_call') as mock_check_call:
+            pull_image('foo:bar')
+
+        mock_check_call.assert_called_once_with('docker pull foo:bar')
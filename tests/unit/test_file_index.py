@@ -0,0 +1,78 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from clickable.exceptions import FileNotFoundException
+from clickable.file_index import FileIndex
+from clickable.utils import find, find_all
+
+
+class TestFileIndex(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        FileIndex.indexes = {}
+
+        self.touch('manifest.json')
+        self.touch('app.desktop')
+        self.touch('a/b/c/deep.desktop')
+        self.touch('.hidden/hidden.desktop')
+        self.touch('node_modules/pkg/manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def touch(self, path):
+        path = os.path.join(self.tmp_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+        return path
+
+    def path(self, path):
+        return os.path.join(self.tmp_dir, path)
+
+    def test_find_all(self):
+        manifest, desktop = find_all([
+            (['manifest.json'], False),
+            (['.desktop'], True),
+        ], self.tmp_dir, ignore_dir=self.path('node_modules'))
+
+        self.assertEqual(self.path('manifest.json'), manifest)
+        self.assertEqual(self.path('app.desktop'), desktop)
+
+    def test_pruning(self):
+        index = FileIndex.get(self.tmp_dir, depth=2, ignore_dir=self.path('node_modules'))
+        found = index.find([(['.desktop'], True), (['manifest.json'], False)])
+
+        self.assertEqual([self.path('app.desktop')], found[0])
+        self.assertEqual([self.path('manifest.json')], found[1])
+        self.assertNotIn(self.path('node_modules'), index.dir_mtimes)
+        self.assertNotIn(self.path('.hidden'), index.dir_mtimes)
+
+    def test_ignore_list(self):
+        self.touch('target/debug/app.desktop')
+        self.touch('other.desktop~')
+
+        index = FileIndex.get(self.tmp_dir, ignore=['node_modules', '*/target', '*~'])
+        found = index.find([(['.desktop', '.desktop~'], True), (['manifest.json'], False)])
+
+        self.assertEqual([self.path('a/b/c/deep.desktop'), self.path('app.desktop')], sorted(found[0]))
+        self.assertEqual([self.path('manifest.json')], found[1])
+        self.assertNotIn(self.path('node_modules'), index.dir_mtimes)
+        self.assertNotIn(self.path('target'), index.dir_mtimes)
+
+    def test_build_dir_preferred(self):
+        build_dir = self.path('.hidden')
+        self.assertEqual(self.path('.hidden/hidden.desktop'),
+                         find(['.desktop'], self.tmp_dir, build_dir=build_dir, extensions_only=True))
+
+    def test_invalidation(self):
+        with self.assertRaises(FileNotFoundException):
+            find(['new.apparmor'], self.tmp_dir)
+
+        index = FileIndex.get(self.tmp_dir)
+        self.assertTrue(index.is_valid())
+
+        new_file = self.touch('a/new.apparmor')
+        self.assertFalse(index.is_valid())
+        self.assertEqual(new_file, find(['new.apparmor'], self.tmp_dir))
@@ -55,6 +55,28 @@ class TestInstallCommand(UnitTest):
         mock_run_subprocess_check_call.assert_called_once_with('adb push /foo/bar.click /home/phablet/', cwd='.', shell=True)
         mock_run_command.assert_called_with(ANY, cwd='.')
 
+    @mock.patch('clickable.commands.install.get_control_digest', return_value='abc')
+    @mock.patch('clickable.device.Device.run_command', return_value='1.2.3\nabc  -\n')
+    @mock.patch('clickable.commands.install.run_subprocess_check_call', side_effect=empty_fn)
+    def test_skip_installed_click(self, mock_run_subprocess_check_call, mock_run_command, mock_get_control_digest):
+        self.config.ssh = 'foo'
+        self.command.run()
+
+        mock_run_command.assert_called_once_with(ANY, get_output=True)
+        mock_run_subprocess_check_call.assert_not_called()
+        mock_get_control_digest.assert_called_once_with('/tmp/build/foo.bar_1.2.3_armhf.click')
+
+    @mock.patch('clickable.commands.install.get_control_digest', return_value='def')
+    @mock.patch('clickable.device.Device.run_command', return_value='1.2.3\nabc  -\n')
+    @mock.patch('clickable.commands.install.run_subprocess_check_call', side_effect=empty_fn)
+    def test_install_changed_click(self, mock_run_subprocess_check_call, mock_run_command, mock_get_control_digest):
+        self.config.ssh = 'foo'
+        self.command.run()
+
+        mock_run_subprocess_check_call.assert_called_once_with(ANY, cwd='/tmp/build', shell=True)
+        mock_run_command.assert_any_call('pkcon remove \\"foo.bar;1.2.3;all;local:click\\"')
+        mock_run_command.assert_called_with(ANY, cwd='/tmp/build')
+
     @mock.patch('clickable.config.project.ProjectConfig.is_desktop_mode', side_effect=true_fn)
     @mock.patch('clickable.commands.install.logger.debug', side_effect=empty_fn)
     def test_skip_desktop_mode(self, mock_logger_debug, mock_desktop_mode):
@@ -0,0 +1,51 @@
+from unittest import TestCase, mock
+import threading
+
+from clickable.exceptions import ClickableException
+from clickable.logger import get_log_prefix
+from ..mocks import ClickableMock
+
+
+class TestMultiArch(TestCase):
+    def setUp(self):
+        self.clickable = ClickableMock(
+            mock_config_json={'builder': 'cmake'},
+            mock_config_env={},
+            mock_install_files=True,
+        )
+        self.builds = []
+        self.lock = threading.Lock()
+
+    def build(self, command, path_arg=None):
+        with self.lock:
+            self.builds.append((command.config.arch, command.config.build_dir, get_log_prefix()))
+
+    def test_build_multiple_archs(self):
+        with mock.patch('clickable.commands.build.BuildCommand.run', autospec=True, side_effect=self.build):
+            self.clickable.run_clickable(['build', '--arch', 'armhf,arm64,amd64'])
+
+        self.assertEqual(['amd64', 'arm64', 'armhf'], sorted(arch for arch, _, _ in self.builds))
+        self.assertEqual(3, len(set(build_dir for _, build_dir, _ in self.builds)))
+        for arch, _, prefix in self.builds:
+            self.assertEqual(arch, prefix)
+
+    def test_build_failure(self):
+        def build(command, path_arg=None):
+            if command.config.arch == 'arm64':
+                raise ClickableException('arm64 failed')
+
+            self.build(command, path_arg)
+
+        with mock.patch('clickable.commands.build.BuildCommand.run', autospec=True, side_effect=build):
+            with self.assertRaises(ClickableException):
+                self.clickable.run_clickable(['build', '--arch', 'armhf,arm64'])
+
+        self.assertEqual(['armhf'], [arch for arch, _, _ in self.builds])
+
+    def test_unsupported_command(self):
+        with self.assertRaises(ClickableException):
+            self.clickable.run_clickable(['install', '--arch', 'armhf,arm64'])
+
+    def test_container_mode(self):
+        with self.assertRaises(ClickableException):
+            self.clickable.run_clickable(['build', '--arch', 'armhf,arm64', '--container-mode'])
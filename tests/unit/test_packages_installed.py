@@ -0,0 +1,59 @@
+from unittest import TestCase, mock
+import os
+import shutil
+import tempfile
+
+from clickable.system.queries.packages_installed import PackagesInstalled
+
+
+STATUS = '''Package: cmake
+Status: install ok installed
+Architecture: amd64
+Description: cross-platform, open-source make system
+ CMake is used to control the software compilation process
+ Status: not a field
+
+Package: libfoo-dev
+Status: install ok installed
+Architecture: armhf
+
+Package: libbar-dev
+Status: deinstall ok config-files
+Architecture: amd64
+
+Package: fonts-foo
+Status: install ok installed
+Architecture: all
+'''
+
+
+class TestPackagesInstalled(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.status_file = os.path.join(self.tmp_dir, 'status')
+        with open(self.status_file, 'w') as f:
+            f.write(STATUS)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        PackagesInstalled.cache.clear()
+
+    def query(self, packages):
+        return PackagesInstalled(packages, status_file=self.status_file)
+
+    def test_installed(self):
+        self.assertTrue(self.query(['cmake', 'libfoo-dev:armhf', 'fonts-foo:armhf']).is_met())
+
+    def test_missing(self):
+        query = self.query(['cmake', 'libfoo-dev:arm64', 'libbar-dev', 'qt5-default'])
+        self.assertEqual(['libfoo-dev:arm64', 'libbar-dev', 'qt5-default'], query.get_missing_packages())
+
+    def test_missing_status_file(self):
+        self.assertFalse(PackagesInstalled(['cmake'], status_file=os.path.join(self.tmp_dir, 'none')).is_met())
+
+    def test_parsed_once(self):
+        with mock.patch.object(PackagesInstalled, 'parse_status', autospec=True, return_value={}) as mock_parse_status:
+            self.query(['cmake']).is_met()
+            self.query(['cmake']).is_met()
+
+        mock_parse_status.assert_called_once()
@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from clickable.config.placeholders import Placeholders
+from clickable.exceptions import ClickableException
+
+
+class TestPlaceholders(TestCase):
+    def setUp(self):
+        self.placeholders = Placeholders({
+            'ARCH': 'arch',
+            'ARCH_TRIPLET': 'arch_triplet',
+            'ROOT': 'root_dir',
+            'BUILD_DIR': 'build_dir',
+            'INSTALL_DIR': 'install_dir',
+        })
+
+    def test_substitute(self):
+        config = {'arch': 'armhf', 'arch_triplet': 'arm-linux-gnueabihf'}
+
+        self.assertEqual('lib/arm-linux-gnueabihf/armhf', self.placeholders.substitute('lib/${ARCH_TRIPLET}/${ARCH}', config))
+        self.assertEqual('lib/arm-linux-gnueabihf/armhf', self.placeholders.substitute('lib/$ARCH_TRIPLET/$ARCH', config))
+        self.assertEqual(['armhf', '${UNKNOWN}'], self.placeholders.substitute(['${ARCH}', '${UNKNOWN}'], config))
+        self.assertEqual({'A': 'armhf'}, self.placeholders.substitute({'A': '$ARCH'}, config))
+
+    def test_resolve_in_dependency_order(self):
+        config = {
+            'arch': 'armhf',
+            'install_dir': '${BUILD_DIR}/install',
+            'build_dir': '${ROOT}/build/${ARCH}',
+            'root_dir': '/project',
+        }
+
+        self.placeholders.resolve(config, ['install_dir', 'build_dir', 'root_dir'])
+
+        self.assertEqual('/project/build/armhf', config['build_dir'])
+        self.assertEqual('/project/build/armhf/install', config['install_dir'])
+
+    def test_resolve_cycle(self):
+        config = {
+            'root_dir': '${INSTALL_DIR}/..',
+            'build_dir': '${ROOT}/build',
+            'install_dir': '${BUILD_DIR}/install',
+        }
+
+        with self.assertRaisesRegex(ClickableException, 'root_dir -> install_dir -> build_dir -> root_dir'):
+            self.placeholders.resolve(config, ['root_dir', 'build_dir', 'install_dir'])
@@ -1,4 +1,7 @@
 from unittest import mock
+import os
+import shutil
+import tempfile
 
 from clickable.commands.publish import PublishCommand
 from .base_test import UnitTest
@@ -8,6 +11,34 @@ class TestPublishCommand(UnitTest):
     def setUp(self):
         self.setUpConfig()
         self.command = PublishCommand(self.config)
+        self.config.apikey = 'key'
 
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config.build_dir = self.tmp_dir
+        click = self.config.install_files.get_click_filename()
+        with open(os.path.join(self.tmp_dir, click), 'w') as f:
+            f.write('click')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super().tearDown()
+
+    def test_skip_published_click(self):
+        mock_requests = mock.Mock()
+        mock_requests.codes.ok = 200
+        mock_requests.post.return_value.status_code = 200
+
+        with mock.patch('clickable.commands.publish.published_clicks', os.path.join(self.tmp_dir, 'published.json')), \
+                mock.patch('clickable.commands.publish.requests_available', True), \
+                mock.patch('clickable.commands.publish.requests', mock_requests, create=True):
+            self.command.run()
+            self.command.run()
+            mock_requests.post.assert_called_once()
+
+            self.command.run('new changelog')
+            self.assertEqual(2, mock_requests.post.call_count)
+
+            self.config.force_build = True
+            self.command.run('new changelog')
+            self.assertEqual(3, mock_requests.post.call_count)
 
-# TODO implement this
@@ -0,0 +1,47 @@
+from unittest import TestCase
+import glob
+import importlib
+import inspect
+import os
+
+from clickable.builders import BUILDERS, get_builder
+from clickable.builders.base import Builder
+from clickable.commands import COMMANDS, ALIASES, get_command_class
+from clickable.commands.base import Command
+
+
+def get_module_classes(package, base):
+    package_dir = os.path.dirname(importlib.import_module(package).__file__)
+    for path in glob.glob(os.path.join(package_dir, '*.py')):
+        name = os.path.basename(path)[:-3]
+        module = importlib.import_module('{}.{}'.format(package, name))
+
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, base) and cls.__module__ == module.__name__ and cls.name:
+                yield name, cls
+
+
+class TestRegistry(TestCase):
+    def test_commands(self):
+        commands = {}
+        aliases = {}
+        for module, cls in get_module_classes('clickable.commands', Command):
+            commands[cls.name] = (module, cls.__name__)
+            aliases.update({alias: cls.name for alias in cls.aliases})
+
+        self.assertEqual(commands, COMMANDS)
+        self.assertEqual(aliases, ALIASES)
+
+        for name in COMMANDS:
+            self.assertEqual(name, get_command_class(name).name)
+
+    def test_builders(self):
+        builders = {
+            cls.name: (module, cls.__name__)
+            for module, cls in get_module_classes('clickable.builders', Builder)
+        }
+
+        self.assertEqual(builders, BUILDERS)
+
+        for name in BUILDERS:
+            self.assertEqual(name, get_builder(name).name)
@@ -0,0 +1,60 @@
+from unittest import TestCase, mock
+
+from clickable.system import resources
+from clickable.system.resources import get_available_cpus, get_job_budget
+
+
+GB = 1024 * 1024 * 1024
+
+
+def files_fn(files):
+    def read_file(path):
+        return files.get(path, None)
+
+    return read_file
+
+
+class TestResources(TestCase):
+    def budget(self, files, cpus=64, parallel_builds=1):
+        with mock.patch('clickable.system.resources.read_file', side_effect=files_fn(files)), \
+                mock.patch('os.sched_getaffinity', return_value=set(range(cpus)), create=True):
+            return get_job_budget(parallel_builds)
+
+    def test_cgroup_v2_cpu_limit(self):
+        files = {'/sys/fs/cgroup/cpu.max': '400000 100000'}
+        self.assertEqual(4, self.budget(files))
+
+    def test_cgroup_v2_no_cpu_limit(self):
+        files = {'/sys/fs/cgroup/cpu.max': 'max 100000'}
+        self.assertEqual(64, self.budget(files))
+
+    def test_cgroup_v1_cpu_limit(self):
+        files = {
+            '/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '800000',
+            '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000',
+        }
+        self.assertEqual(8, self.budget(files))
+
+    def test_cgroup_v1_no_cpu_limit(self):
+        files = {
+            '/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '-1',
+            '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000',
+        }
+        self.assertEqual(64, self.budget(files))
+
+    def test_memory_limit(self):
+        files = {
+            '/proc/meminfo': 'MemTotal: {} kB\nMemAvailable: {} kB'.format(64 * GB // 1024, 32 * GB // 1024),
+            '/sys/fs/cgroup/memory.max': str(6 * GB),
+        }
+        self.assertEqual(6, self.budget(files))
+
+    def test_split_between_parallel_builds(self):
+        self.assertEqual(21, self.budget({}, parallel_builds=3))
+        self.assertEqual(1, self.budget({}, cpus=2, parallel_builds=3))
+
+    def test_available_cpus_without_affinity(self):
+        with mock.patch.object(resources.os, 'sched_getaffinity', side_effect=AttributeError, create=True), \
+                mock.patch('os.cpu_count', return_value=12), \
+                mock.patch('clickable.system.resources.read_file', side_effect=files_fn({})):
+            self.assertEqual(12, get_available_cpus())
@@ -0,0 +1,87 @@
+from unittest import TestCase, mock
+import os
+import shutil
+import tempfile
+
+from clickable.staging import IgnoreMatcher, stage_tree
+
+
+class TestStaging(TestCase):
+    def setUp(self):
+        self.src = tempfile.mkdtemp()
+        self.dst = os.path.join(tempfile.mkdtemp(), 'install')
+
+        self.write('clickable.json', '{}')
+        self.write('main.qml', 'Item {}')
+        self.write('assets/logo.svg', '<svg/>')
+        self.write('assets/cache.pyc', '')
+        self.write('build/output', '')
+
+    def tearDown(self):
+        shutil.rmtree(self.src)
+        shutil.rmtree(os.path.dirname(self.dst))
+
+    def write(self, path, content):
+        path = os.path.join(self.src, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def matcher(self):
+        return IgnoreMatcher([os.path.join(self.src, 'build'), 'clickable.json', '*.pyc'])
+
+    def test_ignore_matcher(self):
+        matcher = IgnoreMatcher(['.git', '/project/build', '*.pyc'], extensions=['.rs'])
+
+        self.assertTrue(matcher.matches('.git', '/project/.git'))
+        self.assertTrue(matcher.matches('build', '/project/build'))
+        self.assertTrue(matcher.matches('cache.pyc', '/project/cache.pyc'))
+        self.assertTrue(matcher.matches('main.rs', '/project/src/main.rs'))
+        self.assertFalse(matcher.matches('main.qml', '/project/main.qml'))
+
+    def test_stage_tree(self):
+        stage_tree(self.src, self.dst, self.matcher())
+
+        staged = sorted(
+            os.path.relpath(os.path.join(root, name), self.dst)
+            for (root, dirs, files) in os.walk(self.dst) for name in files
+        )
+        self.assertEqual(['assets/logo.svg', 'main.qml'], staged)
+
+        with open(os.path.join(self.dst, 'main.qml'), 'r') as f:
+            self.assertEqual('Item {}', f.read())
+
+    def test_stage_tree_without_cloning(self):
+        with mock.patch('clickable.staging.clone_file', return_value=False) as mock_clone:
+            stage_tree(self.src, self.dst, self.matcher())
+
+            mock_clone.assert_called()
+            self.assertTrue(os.path.isfile(os.path.join(self.dst, 'assets/logo.svg')))
+
+    def test_unchanged_files_kept(self):
+        stage_tree(self.src, self.dst, self.matcher())
+
+        with mock.patch('clickable.staging.shutil.copy2') as mock_copy, \
+                mock.patch('clickable.staging.clone_file') as mock_clone:
+            stage_tree(self.src, self.dst, self.matcher())
+
+            mock_copy.assert_not_called()
+            mock_clone.assert_not_called()
+
+    def test_sync_removes_deleted_files(self):
+        manifest_path = os.path.join(os.path.dirname(self.dst), 'sync_manifest.json')
+        stage_tree(self.src, self.dst, self.matcher(), manifest_path)
+
+        # Files created by the build are not part of the manifest
+        with open(os.path.join(self.dst, 'app'), 'w') as f:
+            f.write('binary')
+
+        shutil.rmtree(os.path.join(self.src, 'assets'))
+        self.write('new.qml', 'Item {}')
+
+        staged = stage_tree(self.src, self.dst, self.matcher(), manifest_path)
+
+        self.assertEqual(['main.qml', 'new.qml'], staged)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, 'assets')))
+        self.assertTrue(os.path.isfile(os.path.join(self.dst, 'app')))
+        self.assertTrue(os.path.isfile(os.path.join(self.dst, 'new.qml')))
@@ -11,15 +11,20 @@ def zero_fn(*args, **kwargs):
     return 0
 
 
+def no_api_fn(*args, **kwargs):
+    return None
+
+
 class TestUpdateCommand(UnitTest):
     def setUp(self):
         self.setUpConfig()
         self.command = UpdateCommand(self.config)
 
     @mock.patch('clickable.container.Container.check_docker', side_effect=empty_fn)
+    @mock.patch('clickable.utils.get_docker_api', side_effect=no_api_fn)
     @mock.patch('clickable.utils.run_subprocess_call', side_effect=zero_fn)
-    @mock.patch('clickable.commands.update.run_subprocess_check_call', side_effect=empty_fn)
-    def test_update(self, mock_run_subprocess_check_call, mock_run_subprocess_call, mock_check_docker):
+    @mock.patch('clickable.utils.run_subprocess_check_call', side_effect=empty_fn)
+    def test_update(self, mock_run_subprocess_check_call, mock_run_subprocess_call, mock_get_docker_api, mock_check_docker):
         self.command.run()
 
         mock_check_docker.assert_called_once_with()